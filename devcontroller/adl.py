@@ -18,7 +18,7 @@ import time
 from adl_x547.driver import ADLSputterDriver
 
 from devcontroller.misc.error import ExecutionError
-from devcontroller.misc.thread import StoppableThread
+from devcontroller.misc.thread import StoppableThread, run_concurrently
 
 from e21_util.retry import retry
 from e21_util.interface import Loggable
@@ -35,6 +35,9 @@ class ADLController(Loggable):
             sputter_voltage(voltage [V]): Sputters in voltage mode with voltage
             on()/turn_on(): Sputters with the pre-set values
             off()/turn_off(): Turns off sputtering immediately
+            is_on(): Returns True if the supply was turned on (and is kept alive)
+            get_power()/get_voltage()/get_current(): Returns the actual power [W], voltage [V], current [A]
+            get_snapshot(): Returns power, voltage and current from one single reading
     """
 
     def __init__(self, sputter, logger):
@@ -102,6 +105,9 @@ class ADLController(Loggable):
 
     @retry()
     def turn_on(self):
+        # the supply is switched on right away, the thread only keeps it alive
+        self._driver.turn_on()
+
         if self.thread is None or not self.thread.is_running():
             self.thread = TurnOnThread()
             self.thread.daemon = True
@@ -119,6 +125,10 @@ class ADLController(Loggable):
         self.current_mode = None
         self._driver.turn_off()
 
+    def is_on(self):
+        # the supply is on as long as the keep-alive thread runs
+        return self.thread is not None and self.thread.is_running()
+
     def on(self):
         self.turn_on()
 
@@ -141,6 +151,43 @@ class ADLController(Loggable):
     def get_current(self):
         return self._driver.convert_from_current(self.get_actual_values().get_current(), coeff=self.coeff_current)
 
+    def get_snapshot(self):
+        timestamp = time.time()
+        values = self.get_actual_values()
+
+        return ADLSnapshot(timestamp,
+                           self._driver.convert_from_power(values.get_power(), coeff=self.coeff_power),
+                           self._driver.convert_from_voltage(values.get_voltage(), coeff=self.coeff_volt),
+                           self._driver.convert_from_current(values.get_current(), coeff=self.coeff_current))
+
+
+class ADLSnapshot(object):
+    def __init__(self, timestamp, power, voltage, current):
+        self._timestamp = timestamp
+        self._power = power
+        self._voltage = voltage
+        self._current = current
+
+    def get_timestamp(self):
+        return self._timestamp
+
+    def get_power(self):
+        return self._power
+
+    def get_voltage(self):
+        return self._voltage
+
+    def get_current(self):
+        return self._current
+
+    def __str__(self):
+        return "%sW, %sV, %sA" % (self._power, self._voltage, self._current)
+
+
+def get_snapshots(*controllers):
+    # Samples several supplies at once, i.e. get_snapshots(adl_a, adl_b)
+    return run_concurrently([controller.get_snapshot for controller in controllers])
+
 
 class TurnOnThread(StoppableThread):
     def __init__(self):
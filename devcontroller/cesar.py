@@ -13,14 +13,18 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import threading
+import time
+
 from cesar136.driver import Driver
 from cesar136.constants import Parameter
 
 from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.thread import StoppableThread
 
 from e21_util.retry import retry
 from e21_util.interface import Loggable, Interruptable
-from e21_util.interruptor import InterruptableTimerThread
+from e21_util.interruptor import InterruptableTimer, InterruptableTimerThread
 
 
 class CesarController(Loggable, Interruptable):
@@ -35,8 +39,14 @@ class CesarController(Loggable, Interruptable):
             on()/turn_on(): Sputters with the pre-set values
             off()/turn_off(): Turns off sputtering immediately
             get_power(): Returns the delivered power to target
+            get_power_reading(): Returns delivered, forward and reflected power, read in one sequence
+            start_monitoring(interval [s], reflected_limit [W], arc_drop [0-1]): Samples the power periodically
+            stop_monitoring(): Stops the periodic sampling
+            subscribe(callback)/unsubscribe(callback): (Un-)registers callback(event) for arc/reflected power events
     """
 
+    REFLECTED_POWER_LIMIT = 50
+
     def __init__(self, driver, logger, interruptor):
         Loggable.__init__(self, logger)
         Interruptable.__init__(self, interruptor)
@@ -46,6 +56,17 @@ class CesarController(Loggable, Interruptable):
         self._driver = driver
         self._thread = None
         self._current_mode = None
+        self._setpoint = None
+
+        # all requests to the driver are made under this lock, so that the monitor, the keep-alive thread and the
+        # user do not interleave their requests
+        self._lock = threading.RLock()
+        self._monitor = None
+        self._subscribers = []
+        self._last_reading = None
+        self._reflected_limit = self.REFLECTED_POWER_LIMIT
+        self._arc_drop = 0.5
+        self._excursion = False
 
         self.initialize()
 
@@ -56,24 +77,26 @@ class CesarController(Loggable, Interruptable):
 
     def is_connected(self):
         try:
-            return len(self._driver.get_model_number().get_parameter().get()) > 0
+            with self._lock:
+                return len(self._driver.get_model_number().get_parameter().get()) > 0
         except BaseException as e:
             return False
 
     @retry(retry_count=2)
     def initialize(self):
-        self._driver.clear()
-        self._driver.set_control_mode(Parameter.ControlMode.SERIAL_CONTROL)
-        self._driver.set_remote_control(Parameter.ControlOverride.BIT_ENABLE_ON_OFF_BUTTON)
-        self._driver.set_user_port_scaling(40)
-        self._driver.set_time_limit(3)
-        self._driver.set_reflected_power_limit(50)
-        self._driver.set_reflected_power_parameters(3, 40)
+        with self._lock:
+            self._driver.clear()
+            self._driver.set_control_mode(Parameter.ControlMode.SERIAL_CONTROL)
+            self._driver.set_remote_control(Parameter.ControlOverride.BIT_ENABLE_ON_OFF_BUTTON)
+            self._driver.set_user_port_scaling(40)
+            self._driver.set_time_limit(3)
+            self._driver.set_reflected_power_limit(self.REFLECTED_POWER_LIMIT)
+            self._driver.set_reflected_power_parameters(3, 40)
 
     def _check_mode(self, new_mode):
-        if self.current_mode is not None and not self.current_mode == new_mode:
+        if self._current_mode is not None and not self._current_mode == new_mode:
             self._logger.error(
-                "Already sputtering in mode %s. Cannot sputter in new mode %s".format(self.mode, new_mode))
+                "Already sputtering in mode %s. Cannot sputter in new mode %s" % (self._current_mode, new_mode))
             raise ExecutionError("Already sputtering in different mode.")
 
         self._current_mode = new_mode
@@ -81,29 +104,40 @@ class CesarController(Loggable, Interruptable):
     @retry()
     def sputter(self, value, mode=Parameter.Regulation.LOAD_POWER):
         self._check_mode(mode)
-        self._driver.clear()
 
-        self._driver.set_regulation_mode(mode)
-        self._driver.set_setpoint(value)
+        with self._lock:
+            self._driver.clear()
+            self._driver.set_regulation_mode(mode)
+            self._driver.set_setpoint(value)
+
+        # a lower setpoint drops the delivered power on purpose, do not compare against the old level
+        if self._setpoint is not None and value < self._setpoint:
+            self._last_reading = None
+
+        self._setpoint = value
 
         self.turn_on()
 
     @retry()
     def turn_on(self):
         if self._thread is None or not self._thread.is_running():
-            self._thread = TurnOnThread(self._interrupt, InterruptableTimer(self._interruptor, 0.1))
+            self._thread = TurnOnThread(self._interrupt, InterruptableTimer(self._interrupt))
             self._thread.daemon = True
-            self._thread.set_driver(self._driver, self._logger)
+            self._thread.set_driver(self._driver, self._logger, self._lock)
             self._thread.start()
 
     @retry()
     def turn_off(self):
-        if self.thread is not None:
+        if self._thread is not None:
             self._thread.stop()
 
         self._thread = None
         self._current_mode = None
-        self._driver.turn_off()
+        self._setpoint = None
+        self._last_reading = None
+
+        with self._lock:
+            self._driver.turn_off()
 
     def on(self):
         self.turn_on()
@@ -116,7 +150,164 @@ class CesarController(Loggable, Interruptable):
 
     @retry()
     def get_power(self):
-        return self._driver.get_delivered_power()
+        with self._lock:
+            return self._driver.get_delivered_power()
+
+    @retry()
+    def get_power_reading(self):
+        # The three values are requested back-to-back under the lock, so that a reading is consistent.
+        with self._lock:
+            timestamp = time.time()
+            delivered = self._driver.get_delivered_power()
+            forward = self._driver.get_forward_power()
+            reflected = self._driver.get_reflected_power()
+
+        return PowerReading(timestamp, delivered, forward, reflected)
+
+    def get_last_reading(self):
+        return self._last_reading
+
+    def subscribe(self, callback):
+        if callback not in self._subscribers:
+            self._subscribers.append(callback)
+
+    def unsubscribe(self, callback):
+        if callback in self._subscribers:
+            self._subscribers.remove(callback)
+
+    def start_monitoring(self, interval=0.5, reflected_limit=None, arc_drop=0.5):
+        if interval <= 0:
+            raise ValueError("Monitoring interval must be positive")
+
+        if not 0 < arc_drop < 1:
+            raise ValueError("arc_drop must be a fraction between 0 and 1")
+
+        if reflected_limit is None:
+            reflected_limit = self.REFLECTED_POWER_LIMIT
+
+        self._reflected_limit = reflected_limit
+        self._arc_drop = arc_drop
+
+        self.stop_monitoring()
+
+        self._monitor = MonitorThread()
+        self._monitor.daemon = True
+        self._monitor.set_controller(self, self._logger, interval)
+        self._monitor.start()
+
+    def stop_monitoring(self):
+        if self._monitor is not None:
+            self._monitor.stop()
+
+        self._monitor = None
+        self._last_reading = None
+        self._excursion = False
+
+    def is_monitoring(self):
+        return self._monitor is not None and self._monitor.is_running()
+
+    def process_reading(self, reading):
+        previous = self._last_reading
+        self._last_reading = reading
+
+        if reading.get_reflected() > self._reflected_limit:
+            if not self._excursion:
+                self._excursion = True
+                self._emit(PowerEvent(PowerEvent.REFLECTED_POWER_EXCURSION, reading, previous))
+        elif self._excursion:
+            self._excursion = False
+            self._emit(PowerEvent(PowerEvent.REFLECTED_POWER_RECOVERED, reading, previous))
+
+        # An arc shows up as a sudden collapse of the delivered power between two samples, while the generator
+        # still drives the forward power. If the forward power drops as well, the output was turned down.
+        if previous is not None and previous.get_delivered() > 0:
+            collapsed = reading.get_delivered() < (1.0 - self._arc_drop) * previous.get_delivered()
+            driven = reading.get_forward() >= (1.0 - self._arc_drop) * previous.get_forward()
+
+            if collapsed and driven:
+                self._emit(PowerEvent(PowerEvent.ARC, reading, previous))
+
+    def _emit(self, event):
+        self._logger.warning("Sputter event %s: %s", event.get_type(), str(event.get_reading()))
+
+        for callback in list(self._subscribers):
+            try:
+                callback(event)
+            except BaseException:
+                self._logger.exception("Exception in subscriber for sputter events")
+
+
+class PowerReading(object):
+    def __init__(self, timestamp, delivered, forward, reflected):
+        self._timestamp = timestamp
+        self._delivered = delivered
+        self._forward = forward
+        self._reflected = reflected
+
+    def get_timestamp(self):
+        return self._timestamp
+
+    def get_delivered(self):
+        return self._delivered
+
+    def get_forward(self):
+        return self._forward
+
+    def get_reflected(self):
+        return self._reflected
+
+    def __str__(self):
+        return "delivered=%sW, forward=%sW, reflected=%sW" % (self._delivered, self._forward, self._reflected)
+
+
+class PowerEvent(object):
+    ARC = 'arc'
+    REFLECTED_POWER_EXCURSION = 'reflected_power_excursion'
+    REFLECTED_POWER_RECOVERED = 'reflected_power_recovered'
+
+    def __init__(self, type, reading, previous=None):
+        self._type = type
+        self._reading = reading
+        self._previous = previous
+
+    def get_type(self):
+        return self._type
+
+    def get_timestamp(self):
+        return self._reading.get_timestamp()
+
+    def get_reading(self):
+        return self._reading
+
+    def get_previous_reading(self):
+        return self._previous
+
+
+class MonitorThread(StoppableThread):
+    def __init__(self):
+        super(MonitorThread, self).__init__()
+        self._controller = None
+        self._logger = None
+        self._interval = None
+        self._next = None
+
+    def set_controller(self, controller, logger, interval):
+        self._controller = controller
+        self._logger = logger
+        self._interval = interval
+
+    def do_execute(self):
+        if self._next is None:
+            self._next = time.time()
+
+        try:
+            self._controller.process_reading(self._controller.get_power_reading())
+        except BaseException:
+            self._logger.exception("Exception in sputter monitoring thread")
+
+        # keep a fixed cadence, independent of how long the reading took
+        self._next += self._interval
+        time.sleep(max(0.0, self._next - time.time()))
 
 
 class TurnOnThread(InterruptableTimerThread):
@@ -124,14 +315,17 @@ class TurnOnThread(InterruptableTimerThread):
         super(TurnOnThread, self).__init__(interrupt, timer)
         self._logger = None
         self._driver = None
+        self._lock = None
 
-    def set_driver(self, driver, logger):
+    def set_driver(self, driver, logger, lock):
         self._logger = logger
         self._driver = driver
+        self._lock = lock
 
     def do_execute(self):
         try:
-            self._driver.turn_on()
+            with self._lock:
+                self._driver.turn_on()
         except BaseException as e:
             self._logger.warning(
                 "Exception in sputter keep-alive thread. May result in plasma defect if this happens three times in a row.")
@@ -13,10 +13,16 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+
 from sumitomo_f70h.factory import SumitomoF70HFactory
 from e21_util.retry import retry
 from e21_util.interface import Loggable
 
+from devcontroller.misc.fit import linear_fit
+from devcontroller.misc.thread import ControlLoopThread
+from devcontroller.misc.timeseries import TimeSeriesFile
+
 class CompressorController(Loggable):
 
     DOC = """
@@ -27,6 +33,9 @@ class CompressorController(Loggable):
             turn_off(): Turns the compressor off
             reset(): Resets the compressor
             get_status(): returns the status
+            get_all_temperatures(): returns the temperatures
+            start_recording(interval [s]), stop_recording(): records temperatures and status on disk
+            get_recorder(): returns the CompressorRecorder (history, trends, alarms)
     """
 
     def __init__(self, compressor, logger):
@@ -36,6 +45,8 @@ class CompressorController(Loggable):
 
         self._driver.clear()
 
+        self._recorder = None
+
         print(self.DOC)
 
     @retry()
@@ -70,3 +81,107 @@ class CompressorController(Loggable):
     def off(self):
         self.turn_off()
 
+    def get_recorder(self):
+        if self._recorder is None:
+            self._recorder = CompressorRecorder(self, self._logger)
+
+        return self._recorder
+
+    def start_recording(self, interval=60.0):
+        self.get_recorder().start(interval)
+
+    def stop_recording(self):
+        if self._recorder is not None:
+            self._recorder.stop()
+
+
+class CompressorRecorder(object):
+    DOC = """
+        CompressorRecorder - Records the compressor temperatures and status in a bounded file
+
+        Usage:
+            start(interval [s]), stop(): Starts/stops recording
+            record(): Records one sample now
+            get_history(since=None [s]): Returns the samples (time, temperatures [list], status) of the last seconds
+            get_slope(channel [0-3], since=3600 [s]): Returns the temperature change per hour of the channel
+            add_alarm(channel [0-3], threshold, callback=None, above=True): Logs (and calls callback(channel, value))
+                once the temperature crosses the threshold
+    """
+
+    TEMPERATURES = 4
+    CAPACITY = 7 * 24 * 60  # one week with one sample per minute
+    FILE = 'compressor_history.bin'
+
+    def __init__(self, compressor, logger, capacity=CAPACITY):
+        self._compressor = compressor
+        self._logger = logger
+        # time, temperatures, status bits
+        self._series = TimeSeriesFile(self.FILE, 'd' + 'f' * self.TEMPERATURES + 'I', capacity)
+        self._alarms = []
+        self._thread = None
+
+    def start(self, interval=60.0):
+        self.stop()
+
+        self._thread = ControlLoopThread()
+        self._thread.daemon = True
+        self._thread.set_loop(self.record, interval, self._logger)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def record(self):
+        temperatures = [float(t) for t in self._compressor.get_all_temperatures()][:self.TEMPERATURES]
+        temperatures += [float('nan')] * (self.TEMPERATURES - len(temperatures))
+        # the F70H reports its status as a bit field
+        status = int(self._compressor.get_status())
+
+        self._series.append([time.time()] + temperatures + [status])
+        self._check_alarms(temperatures)
+
+    def get_history(self, since=None):
+        if since is not None:
+            since = time.time() - since
+
+        return [(record[0], list(record[1:1 + self.TEMPERATURES]), record[-1]) for record in self._series.read(since)]
+
+    def get_slope(self, channel, since=3600):
+        points = [(t, temperatures[channel]) for t, temperatures, status in self.get_history(since)
+                  if temperatures[channel] == temperatures[channel]]
+
+        if len(points) < 2:
+            return None
+
+        times, values = zip(*points)
+        return linear_fit(times, values).slope * 3600
+
+    def add_alarm(self, channel, threshold, callback=None, above=True):
+        self._alarms.append({'channel': channel, 'threshold': threshold, 'callback': callback, 'above': above,
+                             'active': False})
+
+    def clear_alarms(self):
+        self._alarms = []
+
+    def _check_alarms(self, temperatures):
+        for alarm in self._alarms:
+            value = temperatures[alarm['channel']]
+            exceeded = value > alarm['threshold'] if alarm['above'] else value < alarm['threshold']
+
+            if exceeded and not alarm['active']:
+                self._logger.warning("Compressor temperature %s is %s (threshold %s)", alarm['channel'], value,
+                                     alarm['threshold'])
+                if alarm['callback'] is not None:
+                    try:
+                        alarm['callback'](alarm['channel'], value)
+                    except BaseException:
+                        self._logger.exception("Exception in compressor alarm callback")
+
+            alarm['active'] = exceeded
+
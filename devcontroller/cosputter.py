@@ -0,0 +1,115 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.thread import ConcurrentCall
+
+from e21_util.interface import Loggable
+
+
+class PowerSupplyGroup(Loggable):
+    DOC = """
+        PowerSupplyGroup - Controls several sputter power supplies (i.e. adl_a and adl_b) simultaneously for co-sputtering
+
+        Usage:
+            sputter_power(powers [W]): Sets the power of each supply, i.e. sputter_power([50, 20])
+            sputter_voltage(voltages [V]): Sets the voltage of each supply
+            on()/turn_on(): Turns all supplies on. If one fails, all supplies are turned off again
+            off()/turn_off(): Turns all supplies off
+            get_snapshots(): Returns the actual values (power, voltage, current) of all supplies from one sweep
+            get_skew(): Returns the time difference [s] between the first and the last command of the last operation
+    """
+
+    def __init__(self, supplies, logger=None, max_skew=0.05):
+        if logger is None:
+            logger = LoggerFactory().get_cosputter_logger()
+
+        super(PowerSupplyGroup, self).__init__(logger)
+
+        if len(supplies) == 0:
+            raise ValueError("At least one power supply is required")
+
+        self._supplies = list(supplies)
+        self._max_skew = max_skew
+        self._skew = None
+
+        print(self.DOC)
+
+    def get_supplies(self):
+        return self._supplies
+
+    def get_skew(self):
+        return self._skew
+
+    def _values(self, values):
+        if not isinstance(values, (list, tuple)):
+            values = [values] * len(self._supplies)
+
+        if not len(values) == len(self._supplies):
+            raise ValueError("Expected %s values, got %s" % (len(self._supplies), len(values)))
+
+        return values
+
+    def _execute(self, calls):
+        call = ConcurrentCall()
+        for function, args in calls:
+            call.add(function, *args)
+
+        results = call.run()
+
+        self._skew = call.get_skew()
+        if self._skew is not None and self._skew > self._max_skew:
+            self._logger.warning("Skew between power supplies was %.3f s (allowed: %.3f s)", self._skew, self._max_skew)
+
+        errors = [result.get_exception() for result in results if not result.is_successful()]
+        for error in errors:
+            self._logger.error("Error in power supply group: %s", str(error))
+
+        if len(errors) > 0:
+            raise ExecutionError("%s of %s power supplies failed. See log files" % (len(errors), len(results)))
+
+        return [result.get_value() for result in results]
+
+    def sputter_power(self, powers):
+        values = self._values(powers)
+        self._execute([(supply.sputter_power, (value,)) for supply, value in zip(self._supplies, values)])
+
+    def sputter_voltage(self, voltages):
+        values = self._values(voltages)
+        self._execute([(supply.sputter_voltage, (value,)) for supply, value in zip(self._supplies, values)])
+
+    def turn_on(self):
+        try:
+            self._execute([(supply.turn_on, ()) for supply in self._supplies])
+        except ExecutionError:
+            self._logger.error("Could not turn on all power supplies. Turning all off.")
+            self.turn_off()
+            raise
+
+    def turn_off(self):
+        self._execute([(supply.turn_off, ()) for supply in self._supplies])
+
+    def on(self):
+        self.turn_on()
+
+    def off(self):
+        self.turn_off()
+
+    def power(self, powers):
+        self.sputter_power(powers)
+
+    def get_snapshots(self):
+        return self._execute([(supply.get_snapshot, ()) for supply in self._supplies])
@@ -0,0 +1,161 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.sequence import Sequence, Stage
+
+
+class CryoSequencer(object):
+    DOC = """
+        CryoSequencer - Cools the cryo down and warms it up
+
+        Usage:
+            CryoSequencer(compressor, relay, lakeshore, gauge_cryo.get_pressure, input=1 [1-4])
+            cool_down(temperature [K]): Checks the cryo vacuum, turns on compressor and helium, waits for temperature
+            warm_up(temperature [K]): Closes the helium valve (with leak), turns off the compressor, waits for temperature
+            start_cool_down(temperature [K]), start_warm_up(temperature [K]): Same, but in the background
+            stop(): Stops waiting (the compressor and the helium valve are left as they are)
+            is_running(): True while a background sequence is running
+            get_error(): Returns the exception, which ended the last background sequence, or None
+            get_stage_times(): Returns (stage, duration [s], status) for each stage of the last run
+            get_curve(): Returns the recorded (time, temperature [K], pressure [mbar])
+
+        If a stage fails (timeout, or the cryo pressure rises above max_pressure while cooling),
+        the helium valve is closed (with leak) and the compressor is turned off. Stopping or interrupting a sequence
+        does not.
+    """
+
+    def __init__(self, compressor, relay, lakeshore, read_pressure, input=1, max_pressure=1e-3, logger=None,
+                 timeouts=None, poll=5.0):
+        if logger is None:
+            logger = LoggerFactory().get_cryo_logger()
+
+        self._compressor = compressor
+        self._relay = relay
+        self._lakeshore = lakeshore
+        self._read_pressure = read_pressure
+        self._input = input
+        self._max_pressure = max_pressure
+        self._logger = logger
+        self._poll = poll
+        self._curve = []
+        self._sequence = None
+
+        # per stage timeouts [s]
+        self._timeouts = {'vacuum': 600, 'compressor': 120, 'helium': 60, 'cool-down': 6 * 3600,
+                          'warm-up': 24 * 3600}
+        if timeouts is not None:
+            self._timeouts.update(timeouts)
+
+        print(self.DOC)
+
+    def get_curve(self):
+        return self._curve
+
+    def get_stage_times(self):
+        if self._sequence is None:
+            return []
+        return self._sequence.get_stage_times()
+
+    def get_current_stage(self):
+        if self._sequence is None:
+            return None
+        return self._sequence.get_current_stage()
+
+    def stop(self):
+        if self._sequence is not None:
+            self._sequence.stop()
+
+    def is_running(self):
+        return self._sequence is not None and self._sequence.is_running()
+
+    def get_error(self):
+        if self._sequence is None:
+            return None
+        return self._sequence.get_error()
+
+    def _record(self):
+        temperature = self._lakeshore.get_temperature(self._input)
+        pressure = self._read_pressure()
+        self._curve.append((time.time(), temperature, pressure))
+        return temperature, pressure
+
+    def _vacuum_ok(self):
+        temperature, pressure = self._record()
+        return pressure < self._max_pressure
+
+    def _cold(self, target):
+        temperature, pressure = self._record()
+
+        if pressure >= self._max_pressure:
+            raise ExecutionError("Cryo pressure %s mbar too high while cooling down" % str(pressure))
+
+        return temperature <= target
+
+    def _warm(self, target):
+        temperature, pressure = self._record()
+        return temperature >= target
+
+    def _helium_open(self):
+        return self._relay.is_helium_on() and not self._relay.is_helium_leak_on()
+
+    def _rollback(self):
+        self._relay.helium_off(leak=True)
+        self._compressor.turn_off()
+
+    def _prepare(self, name, stages):
+        if self.is_running():
+            raise ExecutionError("%s is running. Stop it first" % self._sequence.get_name())
+
+        self._curve = []
+        self._sequence = Sequence(name, stages, self._logger, self._rollback)
+        return self._sequence
+
+    def _cool_down(self, temperature):
+        stages = [
+            Stage('vacuum', None, self._vacuum_ok, self._timeouts['vacuum'], self._poll),
+            Stage('compressor', self._compressor.turn_on, self._compressor.is_on, self._timeouts['compressor'],
+                  self._poll),
+            Stage('helium', self._relay.helium_on, self._helium_open, self._timeouts['helium'], self._poll),
+            Stage('cool-down', None, lambda: self._cold(temperature), self._timeouts['cool-down'], self._poll),
+        ]
+
+        return self._prepare('Cryo cool-down', stages)
+
+    def _warm_up(self, temperature):
+        stages = [
+            Stage('helium', lambda: self._relay.helium_off(leak=True), lambda: not self._relay.is_helium_on(),
+                  self._timeouts['helium'], self._poll),
+            Stage('compressor', self._compressor.turn_off, lambda: not self._compressor.is_on(),
+                  self._timeouts['compressor'], self._poll),
+            Stage('warm-up', None, lambda: self._warm(temperature), self._timeouts['warm-up'], self._poll),
+        ]
+
+        return self._prepare('Cryo warm-up', stages)
+
+    def cool_down(self, temperature):
+        return self._cool_down(temperature).run()
+
+    def start_cool_down(self, temperature):
+        self._cool_down(temperature).start()
+
+    def warm_up(self, temperature=290):
+        return self._warm_up(temperature).run()
+
+    def start_warm_up(self, temperature=290):
+        self._warm_up(temperature).start()
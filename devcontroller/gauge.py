@@ -15,10 +15,14 @@
 
 import os
 import time
+import threading
+
+from collections import deque
 
 from e21_util.retry import retry
 from e21_util.interface import Loggable
 from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.thread import ControlLoopThread, ConcurrentCall
 from tpg26x.factory import PfeifferTPG26xFactory
 
 
@@ -59,3 +63,209 @@ class GaugeController(Loggable):
 
     def get_driver(self):
         return self._gauge
+
+
+class PressureSample(object):
+    def __init__(self, pressure, timestamp):
+        self._pressure = pressure
+        self._timestamp = timestamp
+
+    def get_pressure(self):
+        return self._pressure
+
+    def get_timestamp(self):
+        return self._timestamp
+
+    def get_age(self):
+        return time.time() - self._timestamp
+
+
+class GaugeSampler(Loggable):
+    DOC = """
+        GaugeSampler - Reads a gauge periodically in the background and shares the latest reading
+
+        Usage:
+            start()/stop(): Starts/stops the periodic sampling
+            get_sample(): Returns the latest PressureSample (pressure, timestamp) or None
+            get_pressure(max_age [s]): Returns the latest pressure, if it is not older than max_age. Otherwise the
+                gauge is read immediately
+            get_locked_gauge(): Returns the gauge driver, which makes every call under the lock of the sampler
+    """
+
+    def __init__(self, gauge, interval=1.0, logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_gauge_logger()
+
+        super(GaugeSampler, self).__init__(logger)
+
+        self._gauge = gauge
+        self._interval = interval
+        self._sample = None
+        self._lock = threading.Lock()
+        self._thread = None
+
+    def get_gauge(self):
+        return self._gauge
+
+    def get_locked_gauge(self):
+        return LockedGauge(self._gauge, self._lock)
+
+    def start(self):
+        if self.is_running():
+            return
+
+        self._thread = ControlLoopThread()
+        self._thread.daemon = True
+        self._thread.set_loop(self.update, self._interval, self._logger)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def update(self):
+        # only one reading of the gauge at a time
+        with self._lock:
+            sample = PressureSample(self._gauge.get_pressure(), time.time())
+            self._sample = sample
+
+        return sample
+
+    def get_sample(self):
+        return self._sample
+
+    def get_pressure(self, max_age=None):
+        sample = self._sample
+
+        if sample is None or (max_age is not None and sample.get_age() > max_age):
+            sample = self.update()
+
+        return sample.get_pressure()
+
+
+class LockedGauge(object):
+    """
+        Gives access to all methods of a gauge driver. Each call is made under the lock of the sampler, so that it
+        does not interleave with the background readings.
+    """
+
+    def __init__(self, gauge, lock):
+        self._gauge = gauge
+        self._lock = lock
+
+    def __getattr__(self, name):
+        attribute = getattr(self._gauge, name)
+        if not callable(attribute):
+            return attribute
+
+        def call(*args, **kwargs):
+            with self._lock:
+                return attribute(*args, **kwargs)
+
+        return call
+
+
+class MultiGaugeSampler(Loggable):
+    DOC = """
+        MultiGaugeSampler - Reads several gauges (i.e. main and cryo) concurrently in the background
+
+        Usage:
+            start()/stop(): Starts/stops the periodic sampling
+            get_names(): Returns the names of the gauges
+            get_latest(): Returns (timestamp, {name: pressure [mbar]}) of the latest sweep
+            get_series(name, since=None [s]): Returns a list of (timestamp, pressure) for the gauge
+            get_differential(name_a, name_b, since=None [s]): Returns a list of (timestamp, p_a - p_b)
+            get_channel(name): Returns a sampler for a single gauge (see GaugeSampler.get_pressure)
+
+        Gauges which could not be read have the pressure None in the sweep.
+    """
+
+    def __init__(self, gauges, interval=1.0, history=3600, logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_gauge_logger()
+
+        super(MultiGaugeSampler, self).__init__(logger)
+
+        self._channels = dict((name, GaugeSampler(gauge, interval, logger)) for name, gauge in gauges.items())
+        self._interval = interval
+        self._history = deque(maxlen=history)
+        self._thread = None
+
+    def get_names(self):
+        return list(self._channels.keys())
+
+    def get_channel(self, name):
+        return self._channels[name]
+
+    def start(self):
+        if self.is_running():
+            return
+
+        self._thread = ControlLoopThread()
+        self._thread.daemon = True
+        self._thread.set_loop(self.update, self._interval, self._logger)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def update(self):
+        names = self.get_names()
+
+        call = ConcurrentCall()
+        for name in names:
+            call.add(self._channels[name].update)
+
+        timestamp = time.time()
+        results = call.run(self._interval)
+
+        pressures = {}
+        for name, result in zip(names, results):
+            if result.is_successful():
+                pressures[name] = result.get_value().get_pressure()
+            else:
+                pressures[name] = None
+                self._logger.warning("Could not read gauge %s: %s", name, str(result.get_exception()))
+
+        row = (timestamp, pressures)
+        self._history.append(row)
+        return row
+
+    def get_latest(self):
+        if len(self._history) == 0:
+            return None
+
+        return self._history[-1]
+
+    def _rows(self, since=None):
+        rows = list(self._history)
+
+        if since is not None:
+            start = time.time() - since
+            rows = [row for row in rows if row[0] >= start]
+
+        return rows
+
+    def get_series(self, name, since=None):
+        return [(timestamp, pressures[name]) for timestamp, pressures in self._rows(since)
+                if pressures.get(name) is not None]
+
+    def get_differential(self, name_a, name_b, since=None):
+        differential = []
+        for timestamp, pressures in self._rows(since):
+            p_a, p_b = pressures.get(name_a), pressures.get(name_b)
+            if p_a is not None and p_b is not None:
+                differential.append((timestamp, p_a - p_b))
+
+        return differential
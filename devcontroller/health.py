@@ -0,0 +1,136 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from devcontroller.misc.thread import ConcurrentCall
+
+
+class DeviceHealth(object):
+    STATUS_OK = 'ok'
+    STATUS_ERROR = 'error'
+    STATUS_TIMEOUT = 'timeout'
+    # the check of the previous report still runs, the device was not queried again
+    STATUS_BUSY = 'busy'
+
+    def __init__(self, name, status, value=None, error=None, duration=None):
+        self._name = name
+        self._status = status
+        self._value = value
+        self._error = error
+        self._duration = duration
+
+    def get_name(self):
+        return self._name
+
+    def get_status(self):
+        return self._status
+
+    def is_ok(self):
+        return self._status == self.STATUS_OK
+
+    def get_value(self):
+        return self._value
+
+    def get_error(self):
+        return self._error
+
+    def get_duration(self):
+        return self._duration
+
+    def __str__(self):
+        if self.is_ok():
+            return "%-12s ok       %s" % (self._name, str(self._value))
+        if self._status == self.STATUS_TIMEOUT:
+            return "%-12s TIMEOUT" % self._name
+        if self._status == self.STATUS_BUSY:
+            return "%-12s BUSY     previous check still running" % self._name
+        return "%-12s ERROR    %s" % (self._name, str(self._error))
+
+
+class HealthReport(object):
+    def __init__(self, timestamp, devices, duration):
+        self._timestamp = timestamp
+        self._devices = devices
+        self._duration = duration
+
+    def get_timestamp(self):
+        return self._timestamp
+
+    def get_duration(self):
+        return self._duration
+
+    def get_devices(self):
+        return self._devices
+
+    def get(self, name):
+        for device in self._devices:
+            if device.get_name() == name:
+                return device
+
+        raise KeyError(name)
+
+    def is_ok(self):
+        return all(device.is_ok() for device in self._devices)
+
+    def __str__(self):
+        lines = [str(device) for device in self._devices]
+        lines.append("(took %.2f s)" % self._duration)
+        return "\n".join(lines)
+
+
+def check_health(checks, timeout=3.0, running=None):
+    """
+        Runs all checks (list of (name, function)) in parallel. A check which does not finish within timeout seconds
+        is reported as timed out, its thread is left running in the background.
+
+        running is a dict, which keeps the timed out checks between calls. A device whose previous check is still
+        running is not queried again, but reported as busy.
+    """
+    if running is None:
+        running = {}
+
+    names = [name for name, function in checks]
+    started = [(name, function) for name, function in checks if name not in running or running[name].is_done()]
+
+    call = ConcurrentCall()
+    for name, function in started:
+        call.add(function)
+
+    start = time.time()
+    results = dict(zip([name for name, function in started], call.run(timeout)))
+    duration = time.time() - start
+
+    devices = []
+    for name in names:
+        if name not in results:
+            devices.append(DeviceHealth(name, DeviceHealth.STATUS_BUSY))
+            continue
+
+        result = results[name]
+        if result.is_done():
+            running.pop(name, None)
+        else:
+            running[name] = result
+
+        if not result.is_done():
+            devices.append(DeviceHealth(name, DeviceHealth.STATUS_TIMEOUT))
+        elif result.is_successful():
+            devices.append(DeviceHealth(name, DeviceHealth.STATUS_OK, result.get_value(), None, result.get_duration()))
+        else:
+            devices.append(DeviceHealth(name, DeviceHealth.STATUS_ERROR, None, result.get_exception(),
+                                        result.get_duration()))
+
+    return HealthReport(start, devices, duration)
@@ -15,6 +15,11 @@
 
 from ps9000.factory import PS9000Factory
 import time
+import threading
+
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.pid import PID
+from devcontroller.misc.thread import ControlLoopThread
 
 class HeaterController(object):
 
@@ -24,13 +29,41 @@ class HeaterController(object):
         Usage:
             turn_on(current=16), turn_off() : Turns the heater on/off
             measure()                       : Measures Voltage[V] and Current [A]
+            measure_values()                : Returns (voltage [V], current [A]) as numbers
+            regulate(lakeshore, temperature [K], input=1): Regulates the current with the temperature of the
+                                              lakeshore input. Limits: max_current [A], max_rate [A/s]
+            stop_regulation()               : Stops the regulation, the heater keeps its last current
+                                              If the temperature cannot be read several times in a row, the
+                                              regulation turns the current to 0 and stops.
     """
 
-    def __init__(self, supply=None):
+    VOLTAGE = 12
+    MAX_CURRENT = 16
+
+    # The regulation fails safe after this many failed temperature readings in a row
+    MAX_READ_FAILURES = 3
+
+    def __init__(self, supply=None, logger=None):
         if supply is None:
             supply = PS9000Factory().create_powersupply()
 
+        if logger is None:
+            logger = LoggerFactory().get_heater_logger()
+
         self.supply = supply
+        self.logger = logger
+
+        self._lock = threading.Lock()
+        self._step_lock = threading.Lock()
+        self._loop = None
+        self._pid = None
+        self._current = 0.0
+        self._max_current = self.MAX_CURRENT
+        self._max_rate = None
+        self._lakeshore = None
+        self._input = None
+        self._last_step = None
+        self._failures = 0
 
         print(self.DOC)
 
@@ -38,22 +71,112 @@ class HeaterController(object):
         return self.supply
 
     def turn_on(self, current = 16):
-        self.supply.set_voltage(12)
+        self.supply.set_voltage(self.VOLTAGE)
         time.sleep(0.5)
-        self.supply.set_current(current)
+        self.set_current(current)
         self.supply.set_output(True)
 
     def turn_off(self):
-        self.supply.set_current(0)
+        self.stop_regulation()
+        self.set_current(0)
         self.supply.set_output(False)
         self.supply.reset()
 
+    def set_current(self, current):
+        current = max(0.0, min(float(current), self.MAX_CURRENT))
+
+        with self._lock:
+            self.supply.set_current(current)
+            self._current = current
+
+    def measure_values(self):
+        with self._lock:
+            volt = self.supply.measure_voltage()
+            current = self.supply.measure_current()
+
+        return float(volt), float(current)
+
     def measure(self):
-        volt = self.supply.measure_voltage()
-        current = self.supply.measure_current()
+        volt, current = self.measure_values()
 
         return (str(volt) + 'V', str(current) + 'A')
 
+    def regulate(self, lakeshore, temperature, input=1, kp=1.0, ki=0.01, kd=0.0, max_current=MAX_CURRENT,
+                 max_rate=0.2, period=1.0):
+        self.stop_regulation()
+
+        self._lakeshore = lakeshore
+        self._input = input
+        self._max_current = min(max_current, self.MAX_CURRENT)
+        self._max_rate = max_rate
+        self._last_step = None
+        self._failures = 0
+
+        self._pid = PID(kp, ki, kd, 0.0, self._max_current)
+        self._pid.set_setpoint(temperature)
+
+        self.logger.info("Regulating heater to %s K on lakeshore input %s", str(temperature), str(input))
+
+        self.supply.set_voltage(self.VOLTAGE)
+        self.set_current(0)
+        self.supply.set_output(True)
+
+        self._loop = ControlLoopThread()
+        self._loop.daemon = True
+        self._loop.set_loop(self._regulation_step, period, self.logger)
+        self._loop.start()
+
+    def set_target(self, temperature):
+        if self._pid is not None:
+            self._pid.set_setpoint(temperature)
+
+    def stop_regulation(self):
+        if self._loop is not None:
+            self._loop.stop()
+
+            # wait for a running cycle, so that it does not set a current after we return
+            with self._step_lock:
+                self.logger.info("Stopped heater regulation: %s", str(self._loop.get_timing()))
+
+        self._loop = None
+
+    def is_regulating(self):
+        return self._loop is not None and self._loop.is_running()
+
+    def _regulation_step(self):
+        with self._step_lock:
+            # stop_regulation() was called while this cycle was waiting
+            if not self.is_regulating():
+                return
+
+            now = time.time()
+
+            try:
+                temperature = self._lakeshore.get_temperature(self._input)
+            except Exception:
+                self._failures += 1
+                if self._failures < self.MAX_READ_FAILURES:
+                    raise
+
+                # without a temperature, the heater must not keep its current
+                self.logger.exception("Could not read the temperature %s times in a row. Turning the heater current "
+                                      "to 0 and stopping the regulation.", self._failures)
+                # if setting the current fails, the loop goes on and tries again in the next cycle
+                self.set_current(0)
+                self._loop.stop()
+                return
+
+            self._failures = 0
+            current = self._pid.update(temperature, now)
+
+            # limit the change of the current, so that the heater does not get thermal shocks
+            if self._last_step is not None and self._max_rate is not None:
+                step = self._max_rate * (now - self._last_step)
+                current = max(self._current - step, min(self._current + step, current))
+
+            self._last_step = now
+            self.set_current(current)
+
     def on(self, current):
         self.turn_on(current)
 
@@ -14,6 +14,8 @@
 #  along with this program.  If not, see <http://www.gnu.org/licenses/>.
 #
 
+import threading
+
 from e21_util.insitu.connection import Connection
 from e21_util.insitu.devices import Devices
 
@@ -45,9 +47,13 @@ from devcontroller.nxds import nXDSController
 from devcontroller.julabo import JulaboController
 from devcontroller.vat import VATController
 from devcontroller.adl import ADLController
+from devcontroller.cosputter import PowerSupplyGroup
 from devcontroller.shutter import ShutterController
 from devcontroller.compressor import CompressorController
 from devcontroller.lakeshore import LakeshoreController
+from devcontroller.gauge import MultiGaugeSampler
+from devcontroller.health import check_health
+from devcontroller.pressure import PressureEstimator, PressureSource
 
 from e21_util.paths import Paths
 from e21_util.gunparameter import GunConfigParser
@@ -59,6 +65,22 @@ class Instantiator(object):
 
         self._con = connections
         self._log = LoggerFactory()
+        self._shared = {}
+        self._shared_locks = {}
+        self._lock = threading.Lock()
+        self._health_checks = {}
+
+    def _get_shared(self, name, create):
+        # Objects, which must exist only once per session (i.e. background samplers). There is one lock per object,
+        # so that a device which hangs while it is created does not block the others.
+        with self._lock:
+            lock = self._shared_locks.setdefault(name, threading.Lock())
+
+        with lock:
+            if name not in self._shared:
+                self._shared[name] = create()
+
+            return self._shared[name]
 
     def _get(self, device_name):
         transport = self._con.get_transport(device_name)
@@ -67,16 +89,23 @@ class Instantiator(object):
         return transport, logger
 
     def get_relay(self):
-        transport, logger = self._get(Devices.DEVICE_RELAY)
-        driver = RelayFactory.create(transport, logger)
+        # one controller per session, so that all users of the relay board share the lock and the port register
+        def create():
+            transport, logger = self._get(Devices.DEVICE_RELAY)
+            driver = RelayFactory.create(transport, logger)
+
+            return RelayController(driver, self._log.get_relay_logger())
 
-        return RelayController(driver, self._log.get_relay_logger())
+        return self._get_shared('relay', create)
 
     def get_ion_getter(self):
-        transport, logger = self._get(Devices.DEVICE_TERRANOVA)
-        driver = Terranova751AFactory.create(transport, logger)
+        def create():
+            transport, logger = self._get(Devices.DEVICE_TERRANOVA)
+            driver = Terranova751AFactory.create(transport, logger)
 
-        return TerranovaController(driver, self._log.get_terranova_logger())
+            return TerranovaController(driver, self._log.get_terranova_logger())
+
+        return self._get_shared('terranova', create)
 
     def get_theta_motor(self):
         transport, logger = self._get(Devices.DEVICE_THETA)
@@ -114,45 +143,127 @@ class Instantiator(object):
         return SampleZController(self.get_z_motor(), self.get_position_encoder(), self._log.get_z_logger())
 
     def get_scroll(self):
-        transport, logger = self._get(Devices.DEVICE_SCROLL)
-        return nXDSController(EdwardsNXDSFactory.create(transport, logger), logger)
+        def create():
+            transport, logger = self._get(Devices.DEVICE_SCROLL)
+            return nXDSController(EdwardsNXDSFactory.create(transport, logger), logger)
 
-    def get_gauge_main(self):
-        transport, logger = self._get(Devices.DEVICE_GAUGE_MAIN_CHAMBER)
+        return self._get_shared('scroll', create)
+
+    def _create_gauge(self, device_name):
+        transport, logger = self._get(device_name)
         return PfeifferTPG26xFactory.create(transport, logger)
 
+    def get_gauge_main(self):
+        # the gauges are read in the background by the sampler, direct calls have to take its lock
+        return self.get_gauge_sampler().get_channel('main').get_locked_gauge()
+
     def get_gauge_cryo(self):
-        transport, logger = self._get(Devices.DEVICE_GAUGE_CRYO)
-        return PfeifferTPG26xFactory.create(transport, logger)
+        return self.get_gauge_sampler().get_channel('cryo').get_locked_gauge()
+
+    def get_gauge_sampler(self):
+        def create():
+            gauges = {'main': self._create_gauge(Devices.DEVICE_GAUGE_MAIN_CHAMBER),
+                      'cryo': self._create_gauge(Devices.DEVICE_GAUGE_CRYO)}
+            sampler = MultiGaugeSampler(gauges, 1.0, 3600, self._log.get_gauge_logger())
+            sampler.start()
+            return sampler
+
+        return self._get_shared('gauge_sampler', create)
+
+    def get_gauge_main_sampler(self):
+        return self.get_gauge_sampler().get_channel('main')
 
     def get_julabo(self):
-        transport, logger = self._get(Devices.DEVICE_JULABO)
-        return JulaboController(JulaboFactory.create(transport, logger), logger)
+        def create():
+            transport, logger = self._get(Devices.DEVICE_JULABO)
+            return JulaboController(JulaboFactory.create(transport, logger), logger)
+
+        return self._get_shared('julabo', create)
+
+    def _get_valve(self, device_name, calibration_file):
+        transport, logger = self._get(device_name)
+        sampler = self.get_gauge_main_sampler()
+        return VATController(VAT590Factory.create(transport, logger), sampler.get_gauge(), logger,
+                             calibration_file, sampler)
 
     def get_valve_argon(self):
-        transport, logger = self._get(Devices.DEVICE_LEAK_VALVE_ARGON)
-        return VATController(VAT590Factory.create(transport, logger), self.get_gauge_main(), logger)
+        return self._get_shared('vat_ar', lambda: self._get_valve(Devices.DEVICE_LEAK_VALVE_ARGON,
+                                                                  'vat_argon_calibration.json'))
 
     def get_valve_oxygen(self):
-        transport, logger = self._get(Devices.DEVICE_LEAK_VALVE_OXYGEN)
-        return VATController(VAT590Factory.create(transport, logger), self.get_gauge_main(), logger)
+        return self._get_shared('vat_o2', lambda: self._get_valve(Devices.DEVICE_LEAK_VALVE_OXYGEN,
+                                                                  'vat_oxygen_calibration.json'))
 
-    def get_adl_a(self):
-        transport, logger = self._get(Devices.DEVICE_DC_SPUTTER_1)
+    def _get_adl(self, device_name):
+        transport, logger = self._get(device_name)
         return ADLController(ADLSputterFactory.create(transport, logger), logger)
 
+    def get_adl_a(self):
+        # shared, so that get_adl_group() and direct use drive the same keep-alive thread
+        return self._get_shared('adl_a', lambda: self._get_adl(Devices.DEVICE_DC_SPUTTER_1))
+
     def get_adl_b(self):
-        transport, logger = self._get(Devices.DEVICE_DC_SPUTTER_2)
-        return ADLController(ADLSputterFactory.create(transport, logger), logger)
+        return self._get_shared('adl_b', lambda: self._get_adl(Devices.DEVICE_DC_SPUTTER_2))
+
+    def get_adl_group(self):
+        return PowerSupplyGroup([self.get_adl_a(), self.get_adl_b()], self._log.get_cosputter_logger())
 
     def get_shutter(self):
         transport, logger = self._get(Devices.DEVICE_SHUTTER)
-        return ShutterController(TrinamicPD110Factory.create(transport, logger), logger)
+        return ShutterController(TrinamicPD110Factory.create(transport, logger), logger, state_file='shutter.json')
 
     def get_compressor(self):
-        transport, logger = self._get(Devices.DEVICE_COMPRESSOR)
-        return CompressorController(SumitomoF70HFactory.create(transport, logger), logger)
+        def create():
+            transport, logger = self._get(Devices.DEVICE_COMPRESSOR)
+            return CompressorController(SumitomoF70HFactory.create(transport, logger), logger)
+
+        return self._get_shared('compressor', create)
 
     def get_lakeshore(self):
         transport, logger = self._get(Devices.DEVICE_LAKESHORE)
         return LakeshoreController(LakeShore336Factory.create(transport, logger), logger)
+
+    def get_pressure_estimator(self):
+        # valid ranges [mbar] and uncertainties [decades] of the gauge, the VAT sensor and the ion getter pump
+        gauge = self.get_gauge_main_sampler()
+        valve = self.get_valve_argon()
+        ion_getter = self.get_ion_getter()
+
+        sources = [PressureSource('gauge', lambda: gauge.get_pressure(1.0), 5e-9, 1000, 0.1),
+                   PressureSource('vat', valve.get_pressure, 5e-9, 1000, 0.15),
+                   PressureSource('ion getter', ion_getter.get_pressure, 1e-11, 1e-5, 0.3)]
+
+        return PressureEstimator(sources, logger=self._log.get_gauge_logger())
+
+    def health(self, timeout=3.0, max_age=2.0):
+        # Queries the pumps, cooling and gauges in parallel. Slow or offline devices are marked in the report.
+        # The controllers are the ones of the session. A device, whose check of the last call still hangs, is not
+        # queried again. The gauge readings of the sampler may be max_age seconds old.
+        def terranova():
+            ion_getter = self.get_ion_getter()
+            return {'on': ion_getter.is_on(), 'pressure': ion_getter.get_pressure()}
+
+        def scroll():
+            return self.get_scroll().snapshot()
+
+        def compressor():
+            return self.get_compressor().get_status()
+
+        def julabo():
+            cooler = self.get_julabo()
+            return {'on': cooler.get_on(), 'temperature': cooler.get_temperature()}
+
+        def relay():
+            relay = self.get_relay()
+            return {'scroll': relay.is_scroll_on(), 'bypass': relay.is_bypass_on(), 'helium': relay.is_helium_on()}
+
+        # created before the checks, so that the checks only read from it
+        sampler = self.get_gauge_sampler()
+
+        def gauge(name):
+            return lambda: sampler.get_channel(name).get_pressure(max_age)
+
+        checks = [('terranova', terranova), ('scroll', scroll), ('compressor', compressor), ('julabo', julabo),
+                  ('relay', relay), ('gauge main', gauge('main')), ('gauge cryo', gauge('cryo'))]
+
+        return check_health(checks, timeout, self._health_checks)
@@ -14,7 +14,14 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 import time
+import threading
+
+from collections import deque
+
 from lakeshore336.driver import LakeShore336Driver
+from devcontroller.misc.scheduler import get_scheduler
+from devcontroller.misc.thread import ControlLoopThread
+from devcontroller.misc.fit import linear_fit
 from e21_util.retry import retry
 from e21_util.interface import Loggable
 
@@ -25,42 +32,80 @@ class LakeshoreController(Loggable):
 
         Usage:
             heat(temperatue [K], input=1 [1-4], intensity=LakeShore336Driver.HEATER_RANGE_HIGH): turns on the heater.
+            set_setpoint(temperature [K], input=1 [1-4]): changes the setpoint without changing the heater range.
             timer(time [minutes > 0], input=1 [1-4]): Turns the heater off after $time minutes on input.
+                                                      Returns immediately, the heater is turned off in the background
+                                                      (or when the session ends, whatever comes first).
+            get_timers(): Returns the pending timers
+            cancel_timer(timer=None): Cancels the given timer (or all timers)
             turn_off(input [1-4]): Turns the heater off on input.
+            get_temperature(input [1-4]): Returns the temperature [K] of the input
+            get_temperatures(): Returns a TemperatureVector with the temperatures of all inputs
+            start_acquisition(interval [s]), stop_acquisition(): Records all temperatures periodically
+            get_history(since=None [s]): Returns the recorded TemperatureVectors
+            get_trend(input [1-4], since [s]): Returns the temperature change [K/min] over the last seconds
     """
 
-    def __init__(self, lakeshore, logger):
+    INPUTS = (1, 2, 3, 4)
+
+    def __init__(self, lakeshore, logger, scheduler=None, history=3600):
         super(LakeshoreController, self).__init__(logger)
         assert isinstance(lakeshore, LakeShore336Driver)
 
 
+        if scheduler is None:
+            scheduler = get_scheduler()
+
         self.lakeshore = lakeshore
         self.lakeshore.clear()
 
+        self._scheduler = scheduler
+        self._timers = []
+
+        # every request to the driver is made under this lock, so that the acquisition, the timers and the
+        # regulations (i.e. profiles) do not interleave their requests
+        self._lock = threading.Lock()
+        self._history = deque(maxlen=history)
+        self._acquisition = None
+
         print(self.DOC)
 
     @retry()
     def heat(self, heat, input=1, intensity=LakeShore336Driver.HEATER_RANGE_LOW):
-        self.lakeshore.set_control_setpoint(input, heat)
-        self.lakeshore.set_heater_range(input, intensity)
+        with self._lock:
+            self.lakeshore.set_control_setpoint(input, heat)
+            self.lakeshore.set_heater_range(input, intensity)
 
     def timer(self, sleep_in_minutes, input=1):
-        if not isinstance(sleep_in_minutes, (int, long)) or sleep_in_minutes <= 0:
-            raise ValueError("A positive integer as `sleep_in_minutes` has to be given")
+        if not isinstance(sleep_in_minutes, (int, float)) or sleep_in_minutes <= 0:
+            raise ValueError("A positive number as `sleep_in_minutes` has to be given")
+
+        self._logger.info("Turn off heater in %s minutes" % str(sleep_in_minutes))
+
+        action = self._scheduler.schedule(sleep_in_minutes * 60, self.turn_off, input,
+                                          name="Lakeshore: heater off on input %s" % str(input), run_at_exit=True)
+        self._timers.append(action)
 
-        self._logger.info("Turn off heater in %s minutes:" % str(sleep_in_minutes))
+        return action
 
-        i = 1
-        while i <= sleep_in_minutes:
-            self._logger.info("%s minute(s) remaining..." % str(sleep_in_minutes - i + 1))
-            time.sleep(60)
-            i = i + 1
+    def get_timers(self):
+        self._timers = [timer for timer in self._timers if timer.is_pending()]
+        return self._timers
 
-        self.turn_off(input)
+    def cancel_timer(self, timer=None):
+        for action in self.get_timers():
+            if timer is None or timer is action:
+                self._scheduler.cancel(action)
+
+    @retry()
+    def set_setpoint(self, heat, input=1):
+        with self._lock:
+            self.lakeshore.set_control_setpoint(input, heat)
 
     @retry()
     def turn_off(self, input):
-        self.lakeshore.set_heater_range(input, LakeShore336Driver.HEATER_RANGE_OFF)
+        with self._lock:
+            self.lakeshore.set_heater_range(input, LakeShore336Driver.HEATER_RANGE_OFF)
 
     @retry()
     def off(self):
@@ -71,4 +116,75 @@ class LakeshoreController(Loggable):
 
     @retry()
     def get_temperature(self, position):
-        return self.lakeshore.get_temperature(position)
+        with self._lock:
+            return self.lakeshore.get_temperature(position)
+
+    @retry()
+    def get_temperatures(self, inputs=INPUTS):
+        # The queries are sent back-to-back under the lock, without other requests in between
+        with self._lock:
+            start = time.time()
+            temperatures = dict((input, self.lakeshore.get_temperature(input)) for input in inputs)
+            end = time.time()
+
+        return TemperatureVector((start + end) / 2.0, temperatures, end - start)
+
+    def start_acquisition(self, interval=1.0):
+        self.stop_acquisition()
+
+        self._acquisition = ControlLoopThread()
+        self._acquisition.daemon = True
+        self._acquisition.set_loop(self._acquire, interval, self._logger)
+        self._acquisition.start()
+
+    def stop_acquisition(self):
+        if self._acquisition is not None:
+            self._acquisition.stop()
+
+        self._acquisition = None
+
+    def _acquire(self):
+        self._history.append(self.get_temperatures())
+
+    def get_history(self, since=None):
+        history = list(self._history)
+
+        if since is not None:
+            start = time.time() - since
+            history = [vector for vector in history if vector.get_timestamp() >= start]
+
+        return history
+
+    def get_trend(self, input, since=600):
+        history = self.get_history(since)
+
+        if len(history) < 2:
+            return None
+
+        fit = linear_fit([vector.get_timestamp() for vector in history],
+                         [vector.get_temperature(input) for vector in history])
+
+        return fit.slope * 60
+
+
+class TemperatureVector(object):
+    def __init__(self, timestamp, temperatures, duration):
+        self._timestamp = timestamp
+        self._temperatures = temperatures
+        self._duration = duration
+
+    def get_timestamp(self):
+        return self._timestamp
+
+    def get_duration(self):
+        # time needed to read all inputs
+        return self._duration
+
+    def get_temperature(self, input):
+        return self._temperatures[input]
+
+    def get_temperatures(self):
+        return self._temperatures
+
+    def __str__(self):
+        return ", ".join("%s: %s K" % (input, self._temperatures[input]) for input in sorted(self._temperatures))
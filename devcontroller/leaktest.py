@@ -0,0 +1,167 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from devcontroller.misc.fit import linear_fit
+from devcontroller.misc.logger import LoggerFactory
+
+from e21_util.interface import Loggable
+
+
+class LeakTestResult(object):
+    LEAK = 'leak'
+    OUTGASSING = 'outgassing'
+    UNDECIDED = 'undecided'
+
+    def __init__(self, samples, early, late, volume, confidence):
+        self._samples = samples
+        self._early = early
+        self._late = late
+        self._volume = volume
+        self._confidence = confidence
+
+    def get_samples(self):
+        return self._samples
+
+    def get_duration(self):
+        return self._samples[-1][0] - self._samples[0][0]
+
+    def get_rate_of_rise(self):
+        # rate of rise [mbar/s] at the end of the test
+        return self._late.slope
+
+    def get_rate_of_rise_error(self):
+        # half width of the confidence interval [mbar/s]
+        return self._confidence * self._late.slope_error
+
+    def get_leak_rate(self):
+        # [mbar l/s], only if the chamber volume is known
+        if self._volume is None:
+            return None
+        return self._late.slope * self._volume
+
+    def get_leak_rate_error(self):
+        if self._volume is None:
+            return None
+        return self.get_rate_of_rise_error() * self._volume
+
+    def get_classification(self):
+        # A real leak gives a constant rate of rise, while outgassing decays over time.
+        early, late = self._early.slope, self._late.slope
+
+        if early <= 0 or late <= 0:
+            return self.UNDECIDED
+
+        error = (self._early.slope_error ** 2 + self._late.slope_error ** 2) ** 0.5
+        if early - late > self._confidence * error and late < 0.7 * early:
+            return self.OUTGASSING
+
+        return self.LEAK
+
+    def __str__(self):
+        text = "rate of rise %.2e +- %.2e mbar/s" % (self.get_rate_of_rise(), self.get_rate_of_rise_error())
+        if self._volume is not None:
+            text += ", leak rate %.2e +- %.2e mbar l/s" % (self.get_leak_rate(), self.get_leak_rate_error())
+        return text + " (%s, %.0f s)" % (self.get_classification(), self.get_duration())
+
+
+class LeakTest(Loggable):
+    DOC = """
+        LeakTest - Rate of rise leak test
+
+        Usage:
+            LeakTest(gauge.get_pressure, relay, [vat_ar, vat_o2, turbovalve], volume [l])
+            isolate(): Closes the bypass (relay) and all given valves
+            run(isolate=True): Isolates the chamber, samples the pressure and returns a LeakTestResult
+                               (rate of rise [mbar/s], leak rate [mbar l/s], classification leak/outgassing)
+            stop(): Stops a running test
+
+        The test ends once the confidence interval of the rate of rise is narrower than precision (relative), but not
+        before min_duration and not after max_duration seconds. The chamber stays isolated after the test.
+    """
+
+    def __init__(self, read_pressure, relay=None, valves=(), volume=None, logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_leaktest_logger()
+
+        super(LeakTest, self).__init__(logger)
+
+        self._read_pressure = read_pressure
+        self._relay = relay
+        self._valves = list(valves)
+        self._volume = volume
+        self._stop = False
+
+        print(self.DOC)
+
+    def stop(self):
+        self._stop = True
+
+    def isolate(self):
+        if self._relay is not None:
+            self._relay.bypass_off()
+
+        for valve in self._valves:
+            valve.close()
+
+    def run(self, isolate=True, interval=0.5, min_duration=60, max_duration=1800, precision=0.1, confidence=1.96,
+            settle_time=5):
+        self._stop = False
+
+        if isolate:
+            self._logger.info("Isolating chamber")
+            self.isolate()
+            time.sleep(settle_time)
+
+        samples = []
+        result = None
+        start = time.time()
+        next_sample = start
+
+        while not self._stop:
+            samples.append((time.time(), self._read_pressure()))
+            duration = samples[-1][0] - start
+
+            if len(samples) >= 6:
+                result = self._analyze(samples, confidence)
+
+                if duration >= min_duration and result.get_rate_of_rise() > 0 and \
+                        result.get_rate_of_rise_error() <= precision * result.get_rate_of_rise():
+                    self._logger.info("Leak test confident after %.0f s", duration)
+                    break
+
+            if duration >= max_duration:
+                self._logger.info("Leak test reached the maximum duration")
+                break
+
+            next_sample += interval
+            time.sleep(max(0.0, next_sample - time.time()))
+
+        if result is None:
+            return None
+
+        self._logger.info("Leak test: %s", str(result))
+        return result
+
+    def _analyze(self, samples, confidence):
+        # The early half shows outgassing and leak, the late half mainly the leak
+        half = len(samples) // 2
+        times, pressures = zip(*samples)
+
+        early = linear_fit(times[:half], pressures[:half])
+        late = linear_fit(times[half:], pressures[half:])
+
+        return LeakTestResult(samples, early, late, self._volume, confidence)
@@ -0,0 +1,91 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from bisect import bisect_left
+from math import log10
+
+
+class PressureCalibration(object):
+    """
+        Monotone correction curve from the pressure of the VAT sensor to the reference pressure.
+
+        The curve is piecewise linear in log(pressure). Outside of the calibrated range, the offset of the outermost
+        point is used. Monotony is enforced by pooling adjacent violators, so the curve can be inverted.
+    """
+
+    def __init__(self):
+        self._points = []
+        self._x = []
+        self._y = []
+
+    def add_point(self, pressure, reference):
+        self._points.append((log10(pressure), log10(reference)))
+
+    def get_points(self):
+        return [(pow(10, x), pow(10, y)) for x, y in self._points]
+
+    def fit(self):
+        if len(self._points) == 0:
+            raise ValueError("No calibration points given")
+
+        points = sorted(self._points)
+
+        # pool adjacent violators: blocks of (sum x, sum y, count), merged while y decreases
+        blocks = []
+        for x, y in points:
+            blocks.append([x, y, 1])
+            while len(blocks) > 1 and blocks[-2][1] / blocks[-2][2] > blocks[-1][1] / blocks[-1][2]:
+                x_sum, y_sum, count = blocks.pop()
+                blocks[-1][0] += x_sum
+                blocks[-1][1] += y_sum
+                blocks[-1][2] += count
+
+        self._x = [x_sum / count for x_sum, y_sum, count in blocks]
+        self._y = [y_sum / count for x_sum, y_sum, count in blocks]
+
+    @staticmethod
+    def _interpolate(value, xs, ys):
+        i = bisect_left(xs, value)
+
+        if i == 0:
+            return value + ys[0] - xs[0]
+        if i == len(xs):
+            return value + ys[-1] - xs[-1]
+        if xs[i] == xs[i - 1]:
+            return ys[i]
+
+        fraction = (value - xs[i - 1]) / (xs[i] - xs[i - 1])
+        return ys[i - 1] + fraction * (ys[i] - ys[i - 1])
+
+    def correct(self, pressure):
+        return pow(10, self._interpolate(log10(pressure), self._x, self._y))
+
+    def correct_all(self, pressures):
+        xs, ys = self._x, self._y
+        return [pow(10, self._interpolate(log10(pressure), xs, ys)) for pressure in pressures]
+
+    def uncorrect(self, pressure):
+        return pow(10, self._interpolate(log10(pressure), self._y, self._x))
+
+    def to_dict(self):
+        return {'points': self._points}
+
+    @classmethod
+    def from_dict(cls, data):
+        calibration = cls()
+        calibration._points = [tuple(point) for point in data['points']]
+        calibration.fit()
+        return calibration
+
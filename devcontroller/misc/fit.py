@@ -0,0 +1,92 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class LinearFit(object):
+    def __init__(self, slope, intercept, slope_error, intercept_error, residual, count):
+        self.slope = slope
+        self.intercept = intercept
+        self.slope_error = slope_error
+        self.intercept_error = intercept_error
+        self.residual = residual
+        self.count = count
+
+    def evaluate(self, x):
+        return self.intercept + self.slope * x
+
+    def solve(self, y):
+        # returns x, where the line reaches y
+        if self.slope == 0:
+            return None
+        return (y - self.intercept) / self.slope
+
+
+def linear_fit(xs, ys):
+    """
+        Least squares fit of y = intercept + slope * x. The errors are the standard errors of the parameters,
+        residual is the standard deviation of the residuals.
+    """
+    n = len(xs)
+    if n < 2 or not n == len(ys):
+        raise ValueError("At least two points are required for a linear fit")
+
+    # shift x for numerical stability (i.e. unix timestamps)
+    x0 = xs[0]
+    mean_x = sum(x - x0 for x in xs) / float(n)
+    mean_y = sum(ys) / float(n)
+
+    sxx = sum((x - x0 - mean_x) ** 2 for x in xs)
+    sxy = sum((x - x0 - mean_x) * (y - mean_y) for x, y in zip(xs, ys))
+
+    if sxx == 0:
+        raise ValueError("All x values are identical")
+
+    slope = sxy / sxx
+    intercept = mean_y - slope * (mean_x + x0)
+
+    residual, slope_error, intercept_error = 0.0, 0.0, 0.0
+    if n > 2:
+        ssr = sum((y - (mean_y + slope * (x - x0 - mean_x))) ** 2 for x, y in zip(xs, ys))
+        residual = (ssr / (n - 2)) ** 0.5
+        slope_error = residual / sxx ** 0.5
+        intercept_error = residual * (1.0 / n + (mean_x + x0) ** 2 / sxx) ** 0.5
+
+    return LinearFit(slope, intercept, slope_error, intercept_error, residual, n)
+
+
+def plateau_fit(xs, ys):
+    """
+        Extrapolates a curve, which approaches a plateau exponentially: y = plateau - (plateau - y0) * exp(-x / tau).
+        The slope of such a curve drops linearly with y, so the slopes between neighbouring points are fitted against
+        y. Returns (plateau, tau) or None, if the slope does not drop (yet).
+    """
+    points = list(zip(xs, ys))
+
+    centers, slopes = [], []
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if x1 > x0:
+            centers.append((y0 + y1) / 2.0)
+            slopes.append((y1 - y0) / float(x1 - x0))
+
+    try:
+        fit = linear_fit(centers, slopes)
+    except ValueError:
+        return None
+
+    # a constant slope (or a noisy one) does not tell where the plateau is
+    if not fit.slope < -2 * fit.slope_error:
+        return None
+
+    return fit.solve(0.0), -1.0 / fit.slope
@@ -95,3 +95,30 @@ class LoggerFactory(object):
 
     def get_terranova_logger(self):
         return self._get_logger('Controller: Terranova', self.LOG_FILE_CONTROLLER)
+
+    def get_ramp_logger(self):
+        return self._get_logger('Controller: Ramp', self.LOG_FILE_CONTROLLER)
+
+    def get_cosputter_logger(self):
+        return self._get_logger('Controller: Co-Sputter', self.LOG_FILE_CONTROLLER)
+
+    def get_reactive_logger(self):
+        return self._get_logger('Controller: Reactive Sputter', self.LOG_FILE_CONTROLLER)
+
+    def get_scheduler_logger(self):
+        return self._get_logger('Controller: Scheduler', self.LOG_FILE_CONTROLLER)
+
+    def get_profile_logger(self):
+        return self._get_logger('Controller: Temperature Profile', self.LOG_FILE_CONTROLLER)
+
+    def get_heater_logger(self):
+        return self._get_logger('Controller: Heater', self.LOG_FILE_CONTROLLER)
+
+    def get_leaktest_logger(self):
+        return self._get_logger('Controller: Leak Test', self.LOG_FILE_CONTROLLER)
+
+    def get_pumpdown_logger(self):
+        return self._get_logger('Controller: Pump-down', self.LOG_FILE_CONTROLLER)
+
+    def get_cryo_logger(self):
+        return self._get_logger('Controller: Cryo', self.LOG_FILE_CONTROLLER)
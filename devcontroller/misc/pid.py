@@ -0,0 +1,92 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+
+class PID(object):
+    """
+        PID controller with output limits.
+
+        output = bias + kp * e + ki * integral(e) - kd * d(measurement)/dt, where e = setpoint - measurement.
+        The derivative acts on the measurement to avoid kicks on setpoint changes. The integral is frozen while the
+        output is saturated in the direction of the error (anti-windup).
+    """
+
+    def __init__(self, kp, ki=0.0, kd=0.0, output_min=None, output_max=None, bias=0.0):
+        self.kp = kp
+        self.ki = ki
+        self.kd = kd
+        self.output_min = output_min
+        self.output_max = output_max
+        self.bias = bias
+
+        self._setpoint = None
+        self._integral = 0.0
+        self._last_measurement = None
+        self._last_time = None
+
+    def set_setpoint(self, setpoint):
+        self._setpoint = setpoint
+
+    def get_setpoint(self):
+        return self._setpoint
+
+    def reset(self):
+        self._integral = 0.0
+        self._last_measurement = None
+        self._last_time = None
+
+    def _clamp(self, output):
+        if self.output_max is not None and output > self.output_max:
+            return self.output_max
+        if self.output_min is not None and output < self.output_min:
+            return self.output_min
+        return output
+
+    def update(self, measurement, timestamp=None):
+        if self._setpoint is None:
+            raise RuntimeError("No setpoint given")
+
+        if timestamp is None:
+            timestamp = time.time()
+
+        error = self._setpoint - measurement
+
+        dt = 0.0
+        if self._last_time is not None:
+            dt = max(0.0, timestamp - self._last_time)
+
+        derivative = 0.0
+        if dt > 0 and self._last_measurement is not None:
+            derivative = (measurement - self._last_measurement) / dt
+
+        integral = self._integral + error * dt
+        output = self.bias + self.kp * error + self.ki * integral - self.kd * derivative
+        clamped = self._clamp(output)
+
+        # anti-windup: only accept the new integral, if it does not drive the output further into saturation.
+        # The direction depends on the sign of ki, which is negative for reverse acting loops.
+        if clamped == output:
+            self._integral = integral
+        elif output > clamped and self.ki * error < 0:
+            self._integral = integral
+        elif output < clamped and self.ki * error > 0:
+            self._integral = integral
+
+        self._last_measurement = measurement
+        self._last_time = timestamp
+
+        return clamped
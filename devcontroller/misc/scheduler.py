@@ -0,0 +1,249 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+import atexit
+import threading
+import itertools
+
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.thread import StoppableThread
+
+
+class ScheduledAction(object):
+    STATUS_PENDING = 'pending'
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_CANCELLED = 'cancelled'
+
+    def __init__(self, id, name, due, function, args, kwargs, run_at_exit=False):
+        self._id = id
+        self._name = name
+        self._due = due
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs
+        self._run_at_exit = run_at_exit
+        self._status = self.STATUS_PENDING
+        self._error = None
+        self._lock = threading.RLock()
+
+    def get_id(self):
+        return self._id
+
+    def get_name(self):
+        return self._name
+
+    def get_due(self):
+        return self._due
+
+    def get_remaining(self):
+        return max(0.0, self._due - time.time())
+
+    def get_status(self):
+        return self._status
+
+    def get_error(self):
+        return self._error
+
+    def is_pending(self):
+        return self._status == self.STATUS_PENDING
+
+    def is_run_at_exit(self):
+        return self._run_at_exit
+
+    def execute(self):
+        # The action may have been cancelled (or run at exit) after it was picked as due. Returns False if it was
+        # not executed.
+        with self._lock:
+            if not self.is_pending():
+                return False
+
+            try:
+                self._function(*self._args, **self._kwargs)
+                self._status = self.STATUS_DONE
+            except BaseException as e:
+                self._error = e
+                self._status = self.STATUS_FAILED
+                raise
+
+        return True
+
+    def cancel(self):
+        # Returns True if the action was still pending
+        with self._lock:
+            if not self.is_pending():
+                return False
+
+            self._status = self.STATUS_CANCELLED
+
+        return True
+
+    def __str__(self):
+        if self.is_pending():
+            return "#%s %s: in %d s" % (self._id, self._name, self.get_remaining())
+
+        return "#%s %s: %s" % (self._id, self._name, self._status)
+
+
+class Scheduler(object):
+    DOC = """
+        Scheduler - Executes device actions at a later time in the background
+
+        Usage:
+            schedule(delay [s], function, *args, name=None, run_at_exit=False): Executes function(*args) after delay
+                    seconds. Returns a ScheduledAction. Pending actions are lost when the session ends: they are listed
+                    at exit, and the ones with run_at_exit=True (i.e. turning off a heater) are executed right away.
+            cancel(action or id): Cancels a pending action
+            get(id): Returns the action with the given id
+            list(pending=True): Returns the (pending) actions
+    """
+
+    def __init__(self, logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_scheduler_logger()
+
+        self._logger = logger
+        self._actions = []
+        self._ids = itertools.count(1)
+        self._condition = threading.Condition()
+        self._thread = None
+
+        atexit.register(self._at_exit)
+
+    def schedule(self, delay, function, *args, **kwargs):
+        name = kwargs.pop('name', None)
+        if name is None:
+            name = getattr(function, '__name__', str(function))
+
+        run_at_exit = kwargs.pop('run_at_exit', False)
+
+        with self._condition:
+            action = ScheduledAction(next(self._ids), name, time.time() + delay, function, args, kwargs, run_at_exit)
+            self._actions.append(action)
+            self._condition.notify()
+
+        self._logger.info("Scheduled %s", str(action))
+        self._start()
+
+        return action
+
+    def cancel(self, action):
+        if not isinstance(action, ScheduledAction):
+            action = self.get(action)
+
+        with self._condition:
+            cancelled = action.cancel()
+            self._condition.notify()
+
+        if cancelled:
+            self._logger.info("Cancelled %s", str(action))
+
+    def get(self, id):
+        for action in self._actions:
+            if action.get_id() == id:
+                return action
+
+        raise KeyError("No scheduled action with id %s" % str(id))
+
+    def list(self, pending=True):
+        return [action for action in self._actions if action.is_pending() or not pending]
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            with self._condition:
+                self._condition.notify()
+
+        self._thread = None
+
+    def _start(self):
+        if self._thread is None or not self._thread.is_running():
+            self._thread = SchedulerThread()
+            self._thread.daemon = True
+            self._thread.set_scheduler(self)
+            self._thread.start()
+
+    def _next_due(self):
+        # returns the actions which are due, and the time to wait for the next one
+        now = time.time()
+        due, wait = [], None
+
+        for action in self._actions:
+            if not action.is_pending():
+                continue
+            if action.get_due() <= now:
+                due.append(action)
+            elif wait is None or action.get_due() - now < wait:
+                wait = action.get_due() - now
+
+        return due, wait
+
+    def run_pending(self, running):
+        with self._condition:
+            due, wait = self._next_due()
+            if len(due) == 0:
+                self._condition.wait(wait)
+                return
+
+        for action in due:
+            if not running():
+                return
+            try:
+                self._logger.info("Executing %s", str(action))
+                action.execute()
+            except BaseException:
+                self._logger.exception("Exception while executing scheduled action %s", action.get_name())
+
+    def _at_exit(self):
+        # The scheduler thread is a daemon and dies with the interpreter, so nothing pending would ever run.
+        self.stop()
+
+        for action in self.list():
+            if action.is_run_at_exit():
+                print("Executing scheduled action before exit: %s" % str(action))
+                self._logger.warning("Executing %s before exit", str(action))
+                try:
+                    action.execute()
+                except BaseException:
+                    self._logger.exception("Exception while executing scheduled action %s", action.get_name())
+            else:
+                print("WARNING: Scheduled action will not be executed: %s" % str(action))
+                self._logger.warning("Session ends, %s will not be executed", str(action))
+
+
+class SchedulerThread(StoppableThread):
+    def __init__(self):
+        super(SchedulerThread, self).__init__()
+        self._scheduler = None
+
+    def set_scheduler(self, scheduler):
+        self._scheduler = scheduler
+
+    def do_execute(self):
+        self._scheduler.run_pending(self.is_running)
+
+
+_scheduler = None
+
+
+def get_scheduler():
+    # One scheduler (and thread) shared by all controllers
+    global _scheduler
+
+    if _scheduler is None:
+        _scheduler = Scheduler()
+
+    return _scheduler
@@ -0,0 +1,162 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.thread import StoppableThread
+
+
+class Stage(object):
+    """
+        One step of a sequence: action() is executed once, then the sequence waits until condition() returns True.
+        The stage fails if the condition is not met within timeout seconds.
+    """
+
+    def __init__(self, name, action=None, condition=None, timeout=None, poll=1.0):
+        self.name = name
+        self.action = action
+        self.condition = condition
+        self.timeout = timeout
+        self.poll = poll
+
+
+class Sequence(object):
+    STATUS_DONE = 'done'
+    STATUS_FAILED = 'failed'
+    STATUS_STOPPED = 'stopped'
+
+    def __init__(self, name, stages, logger, rollback=None):
+        self._name = name
+        self._stages = list(stages)
+        self._logger = logger
+        self._rollback = rollback
+        self._times = []
+        self._current = None
+        self._stop = False
+        self._thread = None
+
+    def get_name(self):
+        return self._name
+
+    def get_stage_times(self):
+        # list of (stage name, duration [s], status)
+        return self._times
+
+    def get_current_stage(self):
+        return self._current
+
+    def stop(self):
+        self._stop = True
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def get_error(self):
+        # the exception, which ended the last background run, or None
+        if self._thread is None:
+            return None
+        return self._thread.get_error()
+
+    def start(self):
+        if self.is_running():
+            raise ExecutionError("%s is already running" % self._name)
+
+        self._thread = SequenceThread()
+        self._thread.daemon = True
+        self._thread.set_sequence(self, self._logger)
+        self._thread.start()
+
+    def run(self):
+        self._stop = False
+        self._times = []
+
+        for stage in self._stages:
+            self._current = stage.name
+            start = time.time()
+            self._logger.info("%s: starting stage '%s'", self._name, stage.name)
+
+            try:
+                status = self._run_stage(stage, start)
+            except Exception:
+                self._times.append((stage.name, time.time() - start, self.STATUS_FAILED))
+                self._logger.exception("%s: stage '%s' failed", self._name, stage.name)
+                self._do_rollback()
+                raise
+            except BaseException:
+                # interrupted by the user, like stop(): no rollback
+                self._times.append((stage.name, time.time() - start, self.STATUS_STOPPED))
+                self._logger.warning("%s: stage '%s' interrupted", self._name, stage.name)
+                raise
+
+            self._times.append((stage.name, time.time() - start, status))
+            self._logger.info("%s: stage '%s' %s after %.1f s", self._name, stage.name, status, time.time() - start)
+
+            if status == self.STATUS_STOPPED:
+                break
+
+        self._current = None
+        return self._times
+
+    def _run_stage(self, stage, start):
+        if stage.action is not None:
+            stage.action()
+
+        if stage.condition is None:
+            return self.STATUS_DONE
+
+        while not self._stop:
+            if stage.condition():
+                return self.STATUS_DONE
+
+            if stage.timeout is not None and time.time() - start > stage.timeout:
+                raise ExecutionError("Stage '%s' did not finish within %s s" % (stage.name, str(stage.timeout)))
+
+            time.sleep(stage.poll)
+
+        return self.STATUS_STOPPED
+
+    def _do_rollback(self):
+        if self._rollback is None:
+            return
+
+        self._logger.warning("%s: rolling back", self._name)
+        try:
+            self._rollback()
+        except BaseException:
+            self._logger.exception("%s: rollback failed", self._name)
+
+
+class SequenceThread(StoppableThread):
+    def __init__(self):
+        super(SequenceThread, self).__init__()
+        self._sequence = None
+        self._logger = None
+        self._error = None
+
+    def get_error(self):
+        return self._error
+
+    def set_sequence(self, sequence, logger):
+        self._sequence = sequence
+        self._logger = logger
+
+    def do_execute(self):
+        try:
+            self._sequence.run()
+        except BaseException as e:
+            self._error = e
+
+        self.stop()
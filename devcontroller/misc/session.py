@@ -0,0 +1,49 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+
+class NestedSession(object):
+    """
+        Context manager for a device mode (i.e. remote operation), which is entered by the outermost session and left
+        again when it ends, also on errors. Nested sessions share the outer one, so the mode is only switched twice
+        in total.
+    """
+
+    def __init__(self, enter, leave, resource=None):
+        self._enter = enter
+        self._leave = leave
+        self._resource = resource
+        self._depth = 0
+
+    def get_depth(self):
+        return self._depth
+
+    def __enter__(self):
+        if self._depth == 0:
+            try:
+                self._enter()
+            except BaseException:
+                self._leave()
+                raise
+
+        self._depth += 1
+        return self._resource
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self._depth -= 1
+        if self._depth == 0:
+            self._leave()
+
+        return False
@@ -0,0 +1,62 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import json
+
+STATE_PATH = os.environ.get('DEVCONTROLLER_STATE_PATH', os.path.join(os.path.expanduser('~'), '.devcontroller'))
+
+
+class StateFile(object):
+    """
+        Stores a json document, which survives the current session (calibrations, device states, ...).
+        Writing is atomic: the data is written to a temporary file which then replaces the old file.
+    """
+
+    def __init__(self, name, path=None):
+        if path is None:
+            path = STATE_PATH
+
+        self._file = os.path.join(path, name)
+
+    def get_file(self):
+        return self._file
+
+    def exists(self):
+        return os.path.isfile(self._file)
+
+    def load(self, default=None):
+        try:
+            with open(self._file, 'r') as f:
+                return json.load(f)
+        except (IOError, OSError, ValueError):
+            return default
+
+    def save(self, data):
+        directory = os.path.dirname(self._file)
+        if not os.path.isdir(directory):
+            os.makedirs(directory)
+
+        tmp = self._file + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(data, f)
+            f.flush()
+            os.fsync(f.fileno())
+
+        os.rename(tmp, self._file)
+
+    def delete(self):
+        if self.exists():
+            os.remove(self._file)
@@ -62,4 +62,206 @@ def countdown(time):
     thread = CountdownThread()
     thread.set_time(time)
     thread.daemon = True
-    thread.start()
\ No newline at end of file
+    thread.start()
+
+class CallResult(object):
+    def __init__(self, function, args=(), kwargs=None):
+        self._function = function
+        self._args = args
+        self._kwargs = kwargs or {}
+        self._value = None
+        self._exception = None
+        self._start = None
+        self._end = None
+
+    def execute(self, gate=None):
+        if gate is not None:
+            gate.wait()
+
+        self._start = time.time()
+        try:
+            self._value = self._function(*self._args, **self._kwargs)
+        except BaseException as e:
+            self._exception = e
+        finally:
+            self._end = time.time()
+
+    def is_done(self):
+        return self._end is not None
+
+    def is_successful(self):
+        return self.is_done() and self._exception is None
+
+    def get_exception(self):
+        return self._exception
+
+    def get_value(self):
+        if self._exception is not None:
+            raise self._exception
+
+        return self._value
+
+    def get_start(self):
+        return self._start
+
+    def get_end(self):
+        return self._end
+
+    def get_duration(self):
+        if self._start is None or self._end is None:
+            return None
+
+        return self._end - self._start
+
+
+class ConcurrentCall(object):
+    """
+        Executes several functions in parallel threads. All threads are released at the same instant,
+        so that the requests to different devices go out with minimal skew.
+    """
+
+    def __init__(self):
+        self._calls = []
+
+    def add(self, function, *args, **kwargs):
+        self._calls.append(CallResult(function, args, kwargs))
+
+    def run(self, timeout=None):
+        gate = threading.Event()
+        threads = []
+
+        for call in self._calls:
+            thread = threading.Thread(target=call.execute, args=(gate,))
+            thread.daemon = True
+            thread.start()
+            threads.append(thread)
+
+        gate.set()
+
+        deadline = None if timeout is None else time.time() + timeout
+        for thread in threads:
+            if deadline is None:
+                thread.join()
+            else:
+                thread.join(max(0.0, deadline - time.time()))
+
+        return self._calls
+
+    def get_results(self):
+        return self._calls
+
+    def get_skew(self):
+        starts = [call.get_start() for call in self._calls if call.get_start() is not None]
+
+        if len(starts) == 0:
+            return None
+
+        return max(starts) - min(starts)
+
+
+def run_concurrently(functions, timeout=None):
+    call = ConcurrentCall()
+    for function in functions:
+        call.add(function)
+
+    results = call.run(timeout)
+
+    for result in results:
+        if not result.is_done():
+            raise RuntimeError("Concurrent call did not finish within %s seconds" % str(timeout))
+
+    return [result.get_value() for result in results]
+
+
+class LoopTiming(object):
+    def __init__(self, period):
+        self._period = period
+        self._count = 0
+        self._sum = 0.0
+        self._sum_squares = 0.0
+        self._max_jitter = 0.0
+        self._overruns = 0
+        self._last = None
+
+    def tick(self, timestamp, duration):
+        if self._last is not None:
+            jitter = (timestamp - self._last) - self._period
+            self._count += 1
+            self._sum += jitter
+            self._sum_squares += jitter * jitter
+            self._max_jitter = max(self._max_jitter, abs(jitter))
+
+        if duration > self._period:
+            self._overruns += 1
+
+        self._last = timestamp
+
+    def get_count(self):
+        return self._count
+
+    def get_mean_period(self):
+        if self._count == 0:
+            return None
+        return self._period + self._sum / self._count
+
+    def get_jitter(self):
+        # standard deviation of the loop period
+        if self._count == 0:
+            return None
+        mean = self._sum / self._count
+        return max(0.0, self._sum_squares / self._count - mean * mean) ** 0.5
+
+    def get_max_jitter(self):
+        return self._max_jitter
+
+    def get_overruns(self):
+        return self._overruns
+
+    def __str__(self):
+        return "%s cycles, mean period %s s, jitter %s s, max jitter %s s, %s overruns" % (
+            self._count, self.get_mean_period(), self.get_jitter(), self._max_jitter, self._overruns)
+
+
+class ControlLoopThread(StoppableThread):
+    """
+        Calls a function with a fixed period. The cycles are scheduled on absolute deadlines, so that slow
+        cycles do not shift the following ones. If a cycle overruns by more than one period, the schedule is restarted.
+    """
+
+    LOG_INTERVAL = 100
+
+    def __init__(self):
+        super(ControlLoopThread, self).__init__()
+        self._function = None
+        self._period = None
+        self._logger = None
+        self._timing = None
+        self._next = None
+
+    def set_loop(self, function, period, logger):
+        self._function = function
+        self._period = period
+        self._logger = logger
+        self._timing = LoopTiming(period)
+
+    def get_timing(self):
+        return self._timing
+
+    def do_execute(self):
+        now = time.time()
+
+        if self._next is None or now - self._next > self._period:
+            self._next = now
+
+        try:
+            self._function()
+        except BaseException:
+            self._logger.exception("Exception in control loop")
+
+        self._timing.tick(now, time.time() - now)
+
+        if self._timing.get_count() > 0 and self._timing.get_count() % self.LOG_INTERVAL == 0:
+            self._logger.debug("Control loop timing: %s", str(self._timing))
+
+        self._next += self._period
+        time.sleep(max(0.0, self._next - time.time()))
@@ -0,0 +1,114 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import os
+import struct
+import threading
+
+from devcontroller.misc.state import STATE_PATH
+
+
+class TimeSeriesFile(object):
+    """
+        Binary ring buffer on disk with fixed size records. The first field of every record is the timestamp.
+        Once capacity records are stored, the oldest records are overwritten, so the file never grows beyond
+        capacity * record size.
+    """
+
+    MAGIC = b'DCTS'
+    HEADER = struct.Struct('<4sIII')  # magic, record size, capacity, number of written records
+
+    def __init__(self, name, record_format, capacity, path=None):
+        if path is None:
+            path = STATE_PATH
+
+        if not os.path.isdir(path):
+            os.makedirs(path)
+
+        self._file = os.path.join(path, name)
+        self._record = struct.Struct('<' + record_format)
+        self._capacity = capacity
+        self._count = 0
+        self._lock = threading.Lock()
+
+        if os.path.isfile(self._file):
+            self._handle = open(self._file, 'r+b')
+            count = self._read_header()
+
+            if count is not None:
+                self._count = count
+                return
+
+            # different layout, or an empty or truncated file (i.e. after a crash): start a new series
+            self._handle.close()
+
+        self._handle = open(self._file, 'w+b')
+        self._write_header()
+
+    def get_file(self):
+        return self._file
+
+    def _read_header(self):
+        # returns the number of written records, or None if the file does not hold a complete series of this layout
+        header = self._handle.read(self.HEADER.size)
+        if not len(header) == self.HEADER.size:
+            return None
+
+        magic, size, capacity, count = self.HEADER.unpack(header)
+        if not (magic == self.MAGIC and size == self._record.size and capacity == self._capacity):
+            return None
+
+        self._handle.seek(0, os.SEEK_END)
+        if self._handle.tell() < self.HEADER.size + min(count, capacity) * size:
+            return None
+
+        return count
+
+    def _write_header(self):
+        self._handle.seek(0)
+        self._handle.write(self.HEADER.pack(self.MAGIC, self._record.size, self._capacity, self._count))
+
+    def append(self, values):
+        with self._lock:
+            self._handle.seek(self.HEADER.size + (self._count % self._capacity) * self._record.size)
+            self._handle.write(self._record.pack(*values))
+            self._count += 1
+            self._write_header()
+            self._handle.flush()
+
+    def __len__(self):
+        return min(self._count, self._capacity)
+
+    def read(self, since=None):
+        # returns the records (oldest first), optionally only those with timestamp >= since
+        with self._lock:
+            length = len(self)
+            start = self._count - length
+
+            self._handle.seek(self.HEADER.size)
+            data = self._handle.read(self._capacity * self._record.size)
+
+        records = []
+        for i in range(start, start + length):
+            offset = (i % self._capacity) * self._record.size
+            records.append(self._record.unpack_from(data, offset))
+
+        if since is not None:
+            records = [record for record in records if record[0] >= since]
+
+        return records
+
+    def close(self):
+        self._handle.close()
@@ -13,12 +13,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+
+from collections import namedtuple
+
 from edwards_nxds.driver import EdwardsNXDSDriver
 
 from e21_util.retry import retry
 from e21_util.interface import Loggable
 
 
+nXDSStatus = namedtuple('nXDSStatus', ['timestamp', 'running', 'rotation', 'warning', 'fault'])
+
+
 class nXDSController(Loggable):
     DOC = """
         Edwards nXDS Scroll pump controller
@@ -28,9 +35,12 @@ class nXDSController(Loggable):
             is_on(): Returns true if the pump is on
             get_rotation(): Returns the rpm of the pump
             has_warning()/has_fault(): Returns true if the pump has a warning/fault            
+            snapshot(max_age=None [s]): Returns all of the above from one status query (running, rotation, warning, fault)
+
+        The getters use a snapshot which is at most max_age seconds old (default: 0, always query the pump).
     """
 
-    def __init__(self, driver, logger):
+    def __init__(self, driver, logger, max_age=0.0):
         super(nXDSController, self).__init__(logger)
 
         assert isinstance(driver, EdwardsNXDSDriver)
@@ -38,6 +48,9 @@ class nXDSController(Loggable):
         self._driver = driver
         self._driver.clear()
 
+        self.max_age = max_age
+        self._snapshot = None
+
         print(self.DOC)
 
     def get_logger(self):
@@ -49,24 +62,38 @@ class nXDSController(Loggable):
     @retry()
     def on(self):
         self._driver.start_pump()
+        # the state changes, the cached snapshot is outdated
+        self._snapshot = None
 
     @retry()
     def off(self):
         self._driver.stop_pump()
+        self._snapshot = None
 
     @retry()
+    def snapshot(self, max_age=None):
+        if max_age is not None and self._snapshot is not None and time.time() - self._snapshot.timestamp <= max_age:
+            return self._snapshot
+
+        status = self._driver.get_status()
+        self._snapshot = nXDSStatus(timestamp=time.time(),
+                                    running=status.get_register1().flag_running() > 0,
+                                    # rotation of the pump in rpm.
+                                    rotation=status.get_rotation() * 60,
+                                    warning=status.get_register2().flag_warning() > 0,
+                                    fault=status.get_register2().flag_fault() > 0)
+
+        return self._snapshot
+
     def is_on(self):
-        return self._driver.get_status().get_register1().flag_running() > 0
+        return self.snapshot(self.max_age).running
 
-    @retry()
     def get_rotation(self):
         # returns the rotation of the pump in rpm.
-        return self._driver.get_status().get_rotation() * 60
+        return self.snapshot(self.max_age).rotation
 
-    @retry()
     def has_warning(self):
-        return self._driver.get_status().get_register2().flag_warning() > 0
+        return self.snapshot(self.max_age).warning
 
-    @retry()
     def has_fault(self):
-        return self._driver.get_status().get_register2().flag_fault() > 0
+        return self.snapshot(self.max_age).fault
@@ -0,0 +1,229 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from math import log10
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.thread import ConcurrentCall, ControlLoopThread
+
+from e21_util.interface import Loggable
+
+
+class PressureSource(object):
+    def __init__(self, name, read, minimum, maximum, sigma):
+        # read() returns the pressure in mbar, which is only used within [minimum, maximum].
+        # sigma is the uncertainty of the reading in decades, i.e. 0.1 ~ 25%
+        self.name = name
+        self.read = read
+        self.minimum = minimum
+        self.maximum = maximum
+        self.sigma = sigma
+
+    def is_valid(self, pressure):
+        return pressure is not None and self.minimum <= pressure <= self.maximum
+
+
+class PressureEstimate(object):
+    def __init__(self, timestamp, log_pressure, log_sigma, readings, used, agreeing):
+        self._timestamp = timestamp
+        self._log_pressure = log_pressure
+        self._log_sigma = log_sigma
+        self._readings = readings
+        self._used = used
+        self._agreeing = agreeing
+
+    def get_timestamp(self):
+        return self._timestamp
+
+    def get_pressure(self):
+        return pow(10, self._log_pressure)
+
+    def get_uncertainty(self):
+        # one sigma uncertainty in decades
+        return self._log_sigma
+
+    def get_interval(self):
+        # one sigma interval [mbar]
+        return pow(10, self._log_pressure - self._log_sigma), pow(10, self._log_pressure + self._log_sigma)
+
+    def get_readings(self):
+        # {source: pressure or None}
+        return self._readings
+
+    def get_used(self):
+        return self._used
+
+    def get_agreeing(self):
+        return self._agreeing
+
+    def get_disagreeing(self):
+        return [name for name in self._used if name not in self._agreeing]
+
+    def __str__(self):
+        low, high = self.get_interval()
+        return "%.2e mbar (%.2e - %.2e), sources: %s, disagreeing: %s" % (
+            self.get_pressure(), low, high, ", ".join(self._used), ", ".join(self.get_disagreeing()))
+
+
+class PressureEstimator(Loggable):
+    DOC = """
+        PressureEstimator - Combines several pressure readings (gauge, VAT sensor, ion getter pump) into one estimate
+
+        Usage:
+            update(): Reads all sources and returns the new PressureEstimate
+            get_estimate(): Returns the latest PressureEstimate (pressure [mbar], uncertainty [decades], sources)
+            get_pressure(max_age [s]): Returns the estimated pressure [mbar], updating it first if it is older than
+                max_age. Raises ExecutionError if no source contributed within max_age or the uncertainty exceeds
+                max_uncertainty [decades]
+            start(interval [s]), stop(): Updates the estimate periodically in the background
+
+        The estimate is a Kalman filter over log10(pressure). Each source is only used within its valid range and is
+        weighted by its uncertainty. Sources within agreement sigmas of the estimate are reported as agreeing. If no
+        source agrees with the prediction, e.g. after a fast pump down, the filter restarts from the readings.
+    """
+
+    def __init__(self, sources, process_noise=0.05, agreement=3.0, timeout=2.0, max_age=2.0, max_uncertainty=0.5,
+                 logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_gauge_logger()
+
+        super(PressureEstimator, self).__init__(logger)
+
+        if len(sources) == 0:
+            raise ValueError("At least one pressure source is required")
+
+        self._sources = list(sources)
+        # expected change of log10(pressure) per sqrt(second)
+        self._process_noise = process_noise
+        self._agreement = agreement
+        self._timeout = timeout
+        self._max_age = max_age
+        self._max_uncertainty = max_uncertainty
+
+        self._x = None
+        self._variance = None
+        self._time = None
+        self._contributed = None
+        self._estimate = None
+        self._readings = None
+        self._thread = None
+
+    def get_sources(self):
+        return self._sources
+
+    def get_estimate(self):
+        return self._estimate
+
+    def get_pressure(self, max_age=None):
+        if max_age is None:
+            max_age = self._max_age
+
+        now = time.time()
+        estimate = self._estimate
+        if estimate is None or now - estimate.get_timestamp() > max_age:
+            estimate = self.update()
+
+        if estimate is None or self._contributed is None or now - self._contributed > max_age:
+            raise ExecutionError("No valid pressure reading: %s" % str(self._readings))
+
+        if estimate.get_uncertainty() > self._max_uncertainty:
+            raise ExecutionError("Pressure estimate is too uncertain: %s" % str(estimate))
+
+        return estimate.get_pressure()
+
+    def reset(self):
+        self._x = None
+        self._variance = None
+        self._time = None
+        self._contributed = None
+
+    def _read(self):
+        call = ConcurrentCall()
+        for source in self._sources:
+            call.add(source.read)
+
+        readings = {}
+        for source, result in zip(self._sources, call.run(self._timeout)):
+            if result.is_successful():
+                readings[source.name] = result.get_value()
+            else:
+                readings[source.name] = None
+
+        return readings
+
+    def update(self):
+        now = time.time()
+        readings = self._read()
+        self._readings = readings
+
+        measurements = [(source.name, log10(readings[source.name]), source.sigma ** 2) for source in self._sources
+                        if source.is_valid(readings[source.name])]
+
+        if len(measurements) == 0:
+            self._logger.warning("No valid pressure reading: %s", str(readings))
+            if self._variance is not None:
+                self._variance += self._process_noise ** 2 * (now - self._time)
+                self._time = now
+        else:
+            if self._x is not None:
+                self._variance += self._process_noise ** 2 * (now - self._time)
+
+                if not any(abs(z - self._x) <= self._agreement * (variance + self._variance) ** 0.5
+                           for name, z, variance in measurements):
+                    self._logger.info("Pressure readings do not agree with the estimate, restarting: %s",
+                                      str(readings))
+                    self._x = None
+
+            if self._x is None:
+                # start with the weighted mean of the readings
+                weights = [1.0 / variance for name, z, variance in measurements]
+                self._x = sum(w * z for w, (name, z, variance) in zip(weights, measurements)) / sum(weights)
+                self._variance = 1.0 / sum(weights)
+            else:
+                for name, z, variance in measurements:
+                    gain = self._variance / (self._variance + variance)
+                    self._x += gain * (z - self._x)
+                    self._variance *= (1.0 - gain)
+
+            self._time = now
+            self._contributed = now
+
+        if self._x is None:
+            return self._estimate
+
+        used = [name for name, z, variance in measurements]
+        agreeing = [name for name, z, variance in measurements
+                    if abs(z - self._x) <= self._agreement * (variance + self._variance) ** 0.5]
+
+        self._estimate = PressureEstimate(now, self._x, self._variance ** 0.5, readings, used, agreeing)
+
+        return self._estimate
+
+    def start(self, interval=1.0):
+        self.stop()
+
+        self._thread = ControlLoopThread()
+        self._thread.daemon = True
+        self._thread.set_loop(self.update, interval, self._logger)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+
+        self._thread = None
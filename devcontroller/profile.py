@@ -0,0 +1,276 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.thread import StoppableThread
+
+from e21_util.interface import Loggable
+
+
+class LakeshoreProfileTarget(object):
+    def __init__(self, lakeshore, input=1, intensity=None):
+        self._lakeshore = lakeshore
+        self._input = input
+        self._intensity = intensity
+
+    def prepare(self, setpoint):
+        if self._intensity is None:
+            self._lakeshore.heat(setpoint, self._input)
+        else:
+            self._lakeshore.heat(setpoint, self._input, self._intensity)
+
+    def apply(self, setpoint):
+        self._lakeshore.set_setpoint(setpoint, self._input)
+
+    def measure(self):
+        return self._lakeshore.get_temperature(self._input)
+
+
+class JulaboProfileTarget(object):
+    def __init__(self, julabo):
+        self._julabo = julabo
+
+    def prepare(self, setpoint):
+        self._julabo.set_temperature(setpoint)
+
+    def apply(self, setpoint):
+        self._julabo.set_temperature(setpoint)
+
+    def measure(self):
+        return self._julabo.get_temperature()
+
+
+class Ramp(object):
+    def __init__(self, target, rate, tolerance=1.0, timeout=None):
+        # rate in K/min, the segment ends once the temperature is within tolerance of target
+        if rate <= 0:
+            raise ValueError("rate must be positive")
+
+        self.target = target
+        self.rate = rate
+        self.tolerance = tolerance
+        self.timeout = timeout
+
+    def planned_duration(self, start):
+        return abs(self.target - start) / self.rate * 60.0
+
+    def __str__(self):
+        return "Ramp to %s with %s K/min" % (self.target, self.rate)
+
+
+class Soak(object):
+    def __init__(self, duration, tolerance=1.0, timeout=None):
+        # duration in s, counted from the moment the temperature is within tolerance of the setpoint
+        self.duration = duration
+        self.tolerance = tolerance
+        self.timeout = timeout
+
+    def planned_duration(self, start):
+        return self.duration
+
+    def __str__(self):
+        return "Soak for %s s" % self.duration
+
+
+class ProfileReport(object):
+    def __init__(self):
+        self.segments = []
+        self.samples = []
+        self.start = time.time()
+        self.end = None
+
+    def add_segment(self, segment, planned, actual):
+        self.segments.append((str(segment), planned, actual))
+
+    def add_sample(self, setpoint, measured):
+        self.samples.append((time.time(), setpoint, measured))
+
+    def get_total_time(self):
+        end = self.end if self.end is not None else time.time()
+        return end - self.start
+
+    def get_planned_time(self):
+        return sum(planned for name, planned, actual in self.segments)
+
+    def get_max_deviation(self):
+        if len(self.samples) == 0:
+            return None
+        return max(abs(measured - setpoint) for t, setpoint, measured in self.samples)
+
+    def get_mean_deviation(self):
+        if len(self.samples) == 0:
+            return None
+        return sum(abs(measured - setpoint) for t, setpoint, measured in self.samples) / len(self.samples)
+
+    def __str__(self):
+        lines = ["%s: planned %.0f s, took %.0f s" % segment for segment in self.segments]
+        lines.append("Total: planned %.0f s, took %.0f s, deviation max %s K, mean %s K" % (
+            self.get_planned_time(), self.get_total_time(), self.get_max_deviation(), self.get_mean_deviation()))
+        return "\n".join(lines)
+
+
+class TemperatureProfile(Loggable):
+    DOC = """
+        TemperatureProfile - Runs a ramp and soak program on the Lakeshore or the Julabo
+
+        Usage:
+            profile = TemperatureProfile(LakeshoreProfileTarget(lakeshore, input=1), [Ramp(400, 5), Soak(3600), Ramp(300, 10)])
+            profile = TemperatureProfile(JulaboProfileTarget(julabo), [...])
+
+            run(): Runs the program (blocking) and returns a ProfileReport
+            start(): Runs the program in the background
+            stop(): Stops the program, the last setpoint is kept
+            get_report(): Returns the report (planned vs. actual time, deviation from setpoint)
+
+        Ramp(target [K], rate [K/min], tolerance [K]): Moves the setpoint at rate to target. Ends once the temperature is
+                                                       within tolerance of the target.
+        Soak(duration [s], tolerance [K]): Holds the setpoint for duration, counted from the moment the temperature is
+                                           within tolerance.
+    """
+
+    def __init__(self, target, segments, interval=5.0, logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_profile_logger()
+
+        super(TemperatureProfile, self).__init__(logger)
+
+        self._target = target
+        self._segments = list(segments)
+        self._interval = interval
+        self._report = None
+        self._thread = None
+        self._stop = False
+
+        print(self.DOC)
+
+    def get_report(self):
+        return self._report
+
+    def stop(self):
+        self._stop = True
+
+        if self._thread is not None:
+            self._thread.stop()
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def start(self):
+        if self.is_running():
+            raise ExecutionError("Profile is already running")
+
+        self._thread = ProfileThread()
+        self._thread.daemon = True
+        self._thread.set_profile(self, self._logger)
+        self._thread.start()
+
+    def run(self):
+        self._stop = False
+        self._report = ProfileReport()
+
+        setpoint = self._target.measure()
+        self._target.prepare(setpoint)
+
+        for segment in self._segments:
+            if self._stop:
+                break
+
+            self._logger.info("Starting segment: %s", str(segment))
+            start = time.time()
+            planned = segment.planned_duration(setpoint)
+
+            if isinstance(segment, Ramp):
+                setpoint = self._ramp(segment, setpoint)
+            else:
+                self._soak(segment, setpoint)
+
+            self._report.add_segment(segment, planned, time.time() - start)
+
+        self._report.end = time.time()
+        self._logger.info("Profile finished:\n%s", str(self._report))
+
+        return self._report
+
+    def _tick(self, setpoint):
+        measured = self._target.measure()
+        self._report.add_sample(setpoint, measured)
+        return measured
+
+    def _check_timeout(self, segment, start):
+        if segment.timeout is not None and time.time() - start > segment.timeout:
+            raise ExecutionError("Segment '%s' did not finish within %s s" % (str(segment), str(segment.timeout)))
+
+    def _ramp(self, segment, setpoint):
+        start = time.time()
+        begin = setpoint
+        direction = 1 if segment.target >= begin else -1
+
+        while not self._stop:
+            elapsed = time.time() - start
+            setpoint = begin + direction * segment.rate * elapsed / 60.0
+            if direction * (setpoint - segment.target) >= 0:
+                setpoint = segment.target
+
+            self._target.apply(setpoint)
+            measured = self._tick(setpoint)
+
+            if setpoint == segment.target and abs(measured - segment.target) <= segment.tolerance:
+                break
+
+            self._check_timeout(segment, start)
+            time.sleep(self._interval)
+
+        return setpoint
+
+    def _soak(self, segment, setpoint):
+        start = time.time()
+        settled = None
+
+        while not self._stop:
+            measured = self._tick(setpoint)
+
+            if abs(measured - setpoint) <= segment.tolerance:
+                if settled is None:
+                    settled = time.time()
+                    self._logger.info("Settled at %s K after %.0f s", str(measured), settled - start)
+            elif settled is None:
+                self._check_timeout(segment, start)
+
+            if settled is not None and time.time() - settled >= segment.duration:
+                break
+
+            time.sleep(self._interval)
+
+
+class ProfileThread(StoppableThread):
+    def __init__(self):
+        super(ProfileThread, self).__init__()
+        self._profile = None
+        self._logger = None
+
+    def set_profile(self, profile, logger):
+        self._profile = profile
+        self._logger = logger
+
+    def do_execute(self):
+        try:
+            self._profile.run()
+        except BaseException:
+            self._logger.exception("Exception while running temperature profile")
+
+        self.stop()
@@ -0,0 +1,154 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from math import log10
+
+from devcontroller.turbo import TurboSafeController, TurboSpeedMonitor
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.fit import linear_fit
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.sequence import Sequence, Stage
+
+
+class PumpDownSequencer(object):
+    DOC = """
+        PumpDownSequencer - Pumps the chamber down: scroll pump, bypass, turbo pump, close bypass, base pressure
+
+        Usage:
+            PumpDownSequencer(relay, turbo [TurboSafeController], gauge.get_pressure, base_pressure [mbar])
+            run(): Runs the pump-down (blocking)
+            start(): Runs the pump-down in the background
+            stop(): Stops waiting (the pumps keep running)
+            is_running(): True while the background pump-down is running
+            get_error(): Returns the exception, which ended the last background pump-down, or None
+            get_stage_times(): Returns (stage, duration [s], status) for each stage
+            get_curve(): Returns the recorded (time, pressure [mbar])
+            predict_base_pressure(): Returns the estimated seconds until the base pressure is reached
+
+        Each stage is entered as soon as the pressure (or turbo speed) condition of the previous one is met.
+        If a stage fails (timeout, or the turbo pump does not spin up), the turbo pump is turned off. The scroll pump
+        and the bypass are left as they are, so the chamber stays roughed and the bypass is never opened.
+    """
+
+    def __init__(self, relay, turbo, read_pressure, base_pressure=1e-6, turbo_speed=None, logger=None,
+                 roughing_timeout=3600, spin_up_timeout=1800, base_timeout=None, poll=1.0):
+        if logger is None:
+            logger = LoggerFactory().get_pumpdown_logger()
+
+        assert isinstance(turbo, TurboSafeController)
+
+        self._relay = relay
+        self._turbo = turbo
+        self._read_pressure = read_pressure
+        self._base_pressure = base_pressure
+        self._logger = logger
+        self._monitor = TurboSpeedMonitor(turbo, logger=logger)
+        self._spin_up = None
+        self._turbo_speed = turbo_speed
+        self._curve = []
+        self._start = None
+
+        stages = [
+            Stage('scroll pump', self._relay.scroll_on, self._relay.is_scroll_on, 60, poll),
+            Stage('roughing', self._relay.bypass_on,
+                  lambda: self._pressure_below(TurboSafeController.MAX_START_PRESSURE), roughing_timeout, poll),
+            Stage('turbo spin-up', self._start_turbo, self._turbo_spun_up, spin_up_timeout, poll),
+            Stage('close bypass', self._relay.bypass_off, lambda: not self._relay.is_bypass_on(), 60, poll),
+            Stage('base pressure', None, lambda: self._pressure_below(self._base_pressure), base_timeout, poll),
+        ]
+
+        self._sequence = Sequence('Pump-down', stages, logger, self._rollback)
+
+        print(self.DOC)
+
+    def run(self):
+        self._curve = []
+        self._start = time.time()
+        self._spin_up = None
+        return self._sequence.run()
+
+    def start(self):
+        if self._sequence.is_running():
+            raise ExecutionError("Pump-down is already running")
+
+        self._curve = []
+        self._start = time.time()
+        self._spin_up = None
+        self._sequence.start()
+
+    def stop(self):
+        self._sequence.stop()
+        self._monitor.stop()
+
+    def is_running(self):
+        return self._sequence.is_running()
+
+    def get_error(self):
+        return self._sequence.get_error()
+
+    def get_stage_times(self):
+        return self._sequence.get_stage_times()
+
+    def get_current_stage(self):
+        return self._sequence.get_current_stage()
+
+    def get_curve(self):
+        return self._curve
+
+    def _pressure_below(self, pressure):
+        current = self._read_pressure()
+        self._curve.append((time.time(), current))
+        return current < pressure
+
+    def _start_turbo(self):
+        if self._turbo.start() is False:
+            raise ExecutionError("Turbo pump did not start. See log files")
+
+        self._spin_up = self._monitor.spin_up(self._turbo_speed)
+
+    def _turbo_spun_up(self):
+        if not self._spin_up.is_done():
+            return False
+
+        if self._spin_up.get_error() is not None:
+            raise ExecutionError("Turbo pump did not spin up: %s" % str(self._spin_up.get_error()))
+
+        return True
+
+    def _rollback(self):
+        self._monitor.stop()
+
+        # the turbo pump was not started yet
+        if self._spin_up is None:
+            return
+
+        if self._turbo.turn_off() is False:
+            raise ExecutionError("Could not turn off the turbo pump. See log files")
+
+    def predict_base_pressure(self, window=60):
+        # In the high vacuum regime, the pressure roughly follows p ~ t^-n. Fit log(p) against log(t) over the recent
+        # samples and extrapolate to the base pressure.
+        points = [(t - self._start, p) for t, p in self._curve[-window:] if p > 0 and t > self._start]
+
+        if len(points) < 3:
+            return None
+
+        fit = linear_fit([log10(t) for t, p in points], [log10(p) for t, p in points])
+        if fit.slope >= 0:
+            return None
+
+        return max(0.0, pow(10, fit.solve(log10(self._base_pressure))) - points[-1][0])
@@ -0,0 +1,256 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+import time
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.thread import StoppableThread
+
+from e21_util.interface import Loggable
+
+
+# The targets do not import the device drivers, since the insitu and pvd setups only have their own drivers installed.
+
+class ADLRampTarget(object):
+    MODE_POWER = 0
+    MODE_VOLTAGE = 1
+    MODE_CURRENT = 2
+
+    def __init__(self, controller, mode=MODE_POWER):
+        self._controller = controller
+        self._mode = mode
+
+    def apply(self, value):
+        if self._mode == self.MODE_POWER:
+            self._controller.sputter_power(value)
+        elif self._mode == self.MODE_VOLTAGE:
+            self._controller.sputter_voltage(value)
+        else:
+            self._controller.sputter(value, self._controller.get_driver().MODE_CURRENT)
+
+    def is_on(self):
+        return self._controller.is_on()
+
+    def measure(self):
+        # returns the actual value and the reflected power (None for DC supplies)
+        snapshot = self._controller.get_snapshot()
+
+        if self._mode == self.MODE_POWER:
+            return snapshot.get_power(), None
+        if self._mode == self.MODE_VOLTAGE:
+            return snapshot.get_voltage(), None
+
+        return snapshot.get_current(), None
+
+
+class CesarRampTarget(object):
+    def __init__(self, controller):
+        self._controller = controller
+
+    def apply(self, value):
+        # power() also switches the supply on
+        self._controller.power(value)
+
+    def is_on(self):
+        return True
+
+    def measure(self):
+        reading = self._controller.get_power_reading()
+        return reading.get_delivered(), reading.get_reflected()
+
+
+class TrumpfRFRampTarget(object):
+    MODE_POWER = 0
+    MODE_VOLTAGE = 1
+
+    def __init__(self, controller, mode=MODE_POWER, limit=None):
+        # in voltage mode the power limit is the only protection of the target, there is no safe default
+        if mode == self.MODE_VOLTAGE and limit is None:
+            raise ValueError("A power limit is required to ramp the voltage")
+
+        self._controller = controller
+        self._mode = mode
+        self._limit = limit
+
+    def apply(self, value):
+        if self._mode == self.MODE_POWER:
+            self._controller.sputter_power(value, self._limit)
+        else:
+            self._controller.sputter_voltage(value, self._limit)
+
+    def is_on(self):
+        return self._controller.is_on()
+
+    def measure(self):
+        if self._mode == self.MODE_POWER:
+            actual = self._controller.get_power_forward()
+        else:
+            actual = self._controller.get_voltage()
+
+        return actual, self._controller.get_power_backward()
+
+
+class PowerRamp(Loggable):
+    DOC = """
+        PowerRamp - Ramps a sputter power supply along a rate-limited profile
+
+        Usage:
+            ramp(end, step, interval, start=None): Ramps (blocking) from start (default: actual value) to end.
+                    The ADL and Trumpf supplies have to be turned on before, otherwise the ramp fails right away.
+                    The setpoint changes at most by step every interval seconds. The next step is only done if the
+                    actual value follows the setpoint (relative tolerance, at least offset), otherwise the ramp is
+                    held. If it is held longer than hold_timeout seconds, the ramp is aborted.
+            start(end, step, interval, start=None): Same as ramp(), but runs in the background
+            stop(): Stops a running ramp at the current setpoint
+            is_running(): Returns True if a ramp is running
+            get_history(): Returns a list of (time, setpoint, actual value, reflected power) of the last ramp
+
+        Targets:
+            ADLRampTarget(adl, mode=ADLRampTarget.MODE_POWER)
+            CesarRampTarget(cesar): switches the supply on with the first setpoint
+            TrumpfRFRampTarget(trumpfrf, mode=TrumpfRFRampTarget.MODE_POWER, limit=None): limit is required in MODE_VOLTAGE
+    """
+
+    def __init__(self, target, logger=None, tolerance=0.1, offset=1.0, reflected_limit=None, hold_timeout=60):
+        if logger is None:
+            logger = LoggerFactory().get_ramp_logger()
+
+        super(PowerRamp, self).__init__(logger)
+
+        self._target = target
+        self._tolerance = tolerance
+        self._offset = offset
+        self._reflected_limit = reflected_limit
+        self._hold_timeout = hold_timeout
+        self._history = []
+        self._stop = False
+        self._thread = None
+
+    def get_history(self):
+        return self._history
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def stop(self):
+        self._stop = True
+
+        if self._thread is not None:
+            self._thread.stop()
+
+    def _check(self, step, interval):
+        if step <= 0 or interval <= 0:
+            raise ValueError("step and interval must be positive")
+
+        # the ADL and Trumpf targets only change the setpoint, a ramp on a switched off supply would only hold
+        if not self._target.is_on():
+            raise ExecutionError("Power supply is off. Turn it on before ramping")
+
+    def start(self, end, step, interval, start=None):
+        if self.is_running():
+            raise ExecutionError("Ramp already running")
+
+        self._check(step, interval)
+
+        self._thread = RampThread()
+        self._thread.daemon = True
+        self._thread.set_ramp(self, self._logger, (end, step, interval, start))
+        self._thread.start()
+
+    def ramp(self, end, step, interval, start=None):
+        self._check(step, interval)
+
+        self._stop = False
+        self._history = []
+        begin = time.time()
+
+        if start is None:
+            start, reflected = self._target.measure()
+
+        direction = 1 if end >= start else -1
+        setpoint = start
+
+        self._logger.info("Ramping from %s to %s with %s per %s s", str(start), str(end), str(step), str(interval))
+
+        while not self._stop:
+            setpoint = setpoint + direction * step
+            if direction * (setpoint - end) > 0:
+                setpoint = end
+
+            self._target.apply(setpoint)
+            time.sleep(interval)
+
+            self._wait_for_target(setpoint, interval)
+
+            if setpoint == end:
+                break
+
+        self._logger.info("Ramp finished at setpoint %s after %.1f s", str(setpoint), time.time() - begin)
+
+        return setpoint
+
+    def _is_anomalous(self, setpoint, actual, reflected):
+        if self._reflected_limit is not None and reflected is not None and reflected > self._reflected_limit:
+            return "reflected power %s exceeds %s" % (str(reflected), str(self._reflected_limit))
+
+        if abs(actual - setpoint) > max(self._tolerance * abs(setpoint), self._offset):
+            return "actual value %s does not follow setpoint %s" % (str(actual), str(setpoint))
+
+        return None
+
+    def _wait_for_target(self, setpoint, interval):
+        hold_start = None
+
+        while not self._stop:
+            actual, reflected = self._target.measure()
+            self._history.append((time.time(), setpoint, actual, reflected))
+
+            anomaly = self._is_anomalous(setpoint, actual, reflected)
+
+            if anomaly is None:
+                if hold_start is not None:
+                    self._logger.info("Continuing ramp after %.1f s hold", time.time() - hold_start)
+                return
+
+            if hold_start is None:
+                hold_start = time.time()
+                self._logger.warning("Holding ramp: %s", anomaly)
+
+            if time.time() - hold_start > self._hold_timeout:
+                raise ExecutionError("Ramp held for more than %s seconds: %s" % (str(self._hold_timeout), anomaly))
+
+            time.sleep(interval)
+
+
+class RampThread(StoppableThread):
+    def __init__(self):
+        super(RampThread, self).__init__()
+        self._ramp = None
+        self._logger = None
+        self._args = None
+
+    def set_ramp(self, ramp, logger, args):
+        self._ramp = ramp
+        self._logger = logger
+        self._args = args
+
+    def do_execute(self):
+        try:
+            self._ramp.ramp(*self._args)
+        except BaseException:
+            self._logger.exception("Exception while ramping")
+
+        self.stop()
@@ -0,0 +1,126 @@
+# Copyright (C) 2016, see AUTHORS.md
+#
+# This program is free software: you can redistribute it and/or modify
+# it under the terms of the GNU General Public License as published by
+# the Free Software Foundation, either version 3 of the License, or
+# (at your option) any later version.
+#
+# This program is distributed in the hope that it will be useful,
+# but WITHOUT ANY WARRANTY; without even the implied warranty of
+# MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE.  See the
+# GNU General Public License for more details.
+#
+# You should have received a copy of the GNU General Public License
+# along with this program.  If not, see <http://www.gnu.org/licenses/>.
+
+from devcontroller.vat import VATController
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.pid import PID
+from devcontroller.misc.thread import ControlLoopThread
+
+from e21_util.interface import Loggable
+
+
+class ReactiveSputterController(Loggable):
+    DOC = """
+        ReactiveSputterController - Regulates the reactive gas valve (i.e. vat_o2) from a process value
+
+        Usage:
+            ReactiveSputterController(vat_o2, adl_a.get_voltage, kp, ki, kd): regulates on the target voltage
+            ReactiveSputterController(vat_o2, gauge.get_pressure, kp, ki, kd): regulates on a pressure channel
+
+            start(setpoint): Starts the control loop with the given setpoint (i.e. target voltage [V])
+            set_setpoint(setpoint): Changes the setpoint of a running loop
+            stop(): Stops the control loop. The valve keeps its last setpoint
+            get_timing(): Returns the loop timing (mean period, jitter, overruns)
+            get_last(): Returns (process value, valve setpoint [mbar]) of the last cycle
+
+        The output of the loop is the pressure setpoint [mbar] of the valve, limited to [min_pressure, max_pressure].
+        start() sets min_pressure with the plausibility check of the valve, the loop then only writes the setpoint.
+        Note: For metallic targets the target voltage drops with increasing oxygen flow. Use negative gains then.
+    """
+
+    def __init__(self, valve, measure, kp, ki=0.0, kd=0.0, min_pressure=1e-5, max_pressure=1e-2, period=0.1,
+                 deadband=0.01, logger=None):
+        if logger is None:
+            logger = LoggerFactory().get_reactive_logger()
+
+        super(ReactiveSputterController, self).__init__(logger)
+
+        assert isinstance(valve, VATController)
+
+        if max_pressure >= VATController.MAX_PRESSURE:
+            raise ValueError("max_pressure must be below %s mbar" % str(VATController.MAX_PRESSURE))
+
+        if not 0 < min_pressure < max_pressure:
+            raise ValueError("min_pressure must be positive and below max_pressure")
+
+        self._valve = valve
+        self._measure = measure
+        self._period = period
+        self._deadband = deadband
+        self._min_pressure = min_pressure
+        self._pid = PID(kp, ki, kd, min_pressure, max_pressure, bias=min_pressure)
+        self._thread = None
+        self._last_value = None
+        self._last_output = None
+
+        print(self.DOC)
+
+    def get_pid(self):
+        return self._pid
+
+    def set_setpoint(self, setpoint):
+        self._pid.set_setpoint(setpoint)
+
+    def start(self, setpoint):
+        if self.is_running():
+            raise ExecutionError("Control loop is already running")
+
+        if self._valve.is_regulating():
+            raise ExecutionError("The valve is regulated by the reference gauge. Call stop_regulation() first")
+
+        self._pid.reset()
+        self._pid.set_setpoint(setpoint)
+
+        # the reference gauge is only checked once, it is too slow for every cycle of the loop
+        self._valve.set_pressure(self._min_pressure)
+        self._last_output = self._min_pressure
+
+        self._logger.info("Starting reactive control loop with setpoint %s and period %s s", str(setpoint),
+                          str(self._period))
+
+        self._thread = ControlLoopThread()
+        self._thread.daemon = True
+        self._thread.set_loop(self.step, self._period, self._logger)
+        self._thread.start()
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+            self._logger.info("Stopped reactive control loop: %s", str(self._thread.get_timing()))
+
+        self._thread = None
+
+    def is_running(self):
+        return self._thread is not None and self._thread.is_running()
+
+    def get_timing(self):
+        if self._thread is None:
+            return None
+        return self._thread.get_timing()
+
+    def get_last(self):
+        return self._last_value, self._last_output
+
+    def step(self):
+        self._last_value = self._measure()
+        output = self._pid.update(self._last_value)
+
+        # Only write a new setpoint, if it changed noticeably. This saves a lot of traffic on the valve.
+        if self._last_output is not None and abs(output - self._last_output) <= self._deadband * self._last_output:
+            return
+
+        self._valve.write_setpoint(output)
+        self._last_output = output
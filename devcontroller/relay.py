@@ -13,6 +13,9 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+import threading
+
 from relais_197720.driver import RelayDriver
 from relais_197720.constants import Relay
 
@@ -40,15 +43,26 @@ class RelayController(Loggable):
             helium_on(), helium_off(): Opens/Closes the helium valve for the cryo
             off()                    : Turns all off (scroll, lamp, bypass)
             is_scroll_on(), ....     : Returns True if the scroll(...) is On.
+            get_port(), verify()     : Returns the port register (verify() reads it from the board)
 
+        A single port is switched with one set_single/del_single command, which is atomic on the board. Combined
+        changes are applied to the port register in memory and written as one set_port command. The memory is read
+        from the board again every verify_interval seconds and after errors.
     """
 
-    def __init__(self, relay, logger):
+    VERIFY_INTERVAL = 10
+
+    def __init__(self, relay, logger, verify_interval=VERIFY_INTERVAL):
         super(RelayController, self).__init__(logger)
         assert isinstance(relay, RelayDriver)
 
         self.relay = relay
 
+        self._lock = threading.RLock()
+        self._shadow = None
+        self._verified = None
+        self.verify_interval = verify_interval
+
         self.initialize()
 
         print(self.DOC)
@@ -61,56 +75,114 @@ class RelayController(Loggable):
             raise RuntimeError(
                 "Expected to have exactly one relay module, but got {}".format(response.get_number_of_devices()))
 
+        self.verify()
+
     @retry()
-    def helium_on(self):
-        self.relay.set_single(*self.HELIUM_PORT)
-        self.relay.del_single(*self.HELIUM_LEAK_PORT)
+    def verify(self):
+        with self._lock:
+            port = self.relay.get_port(self.RELAY_ADDRESS).get_response().get_port()
+
+            if self._shadow is not None and not port == self._shadow:
+                self._logger.warning("Relay port register is %s, expected %s", str(port), str(self._shadow))
+
+            self._shadow = port
+            self._verified = time.time()
+
+        return port
+
+    def get_port(self):
+        with self._lock:
+            if self._shadow is None or time.time() - self._verified > self.verify_interval:
+                return self.verify()
+
+            return self._shadow
 
     @retry()
+    def _change(self, on=(), off=()):
+        # Applies all changes in one write
+        with self._lock:
+            try:
+                if len(on) + len(off) == 1:
+                    port = self._change_single(on, off)
+                else:
+                    port = self.get_port()
+
+                    for address, bit in off:
+                        port &= ~bit
+                    for address, bit in on:
+                        port |= bit
+
+                    self.relay.set_port(self.RELAY_ADDRESS, port)
+            except BaseException:
+                # the state of the board is unknown now, read it again next time
+                self._shadow = None
+                raise
+
+            self._shadow = port
+
+    def _change_single(self, on, off):
+        # needs no read of the register, the board sets or clears the bit by itself
+        if len(on) == 1:
+            address, bit = on[0]
+            self.relay.set_single(address, bit)
+            port = None if self._shadow is None else self._shadow | bit
+        else:
+            address, bit = off[0]
+            self.relay.del_single(address, bit)
+            port = None if self._shadow is None else self._shadow & ~bit
+
+        return port
+
+    def helium_on(self):
+        self._change(on=[self.HELIUM_PORT], off=[self.HELIUM_LEAK_PORT])
+
     def helium_off(self, leak=True):
-        self.relay.del_single(*self.HELIUM_PORT)
         if leak:
-            self.relay.set_single(*self.HELIUM_LEAK_PORT)
+            self._change(on=[self.HELIUM_LEAK_PORT], off=[self.HELIUM_PORT])
+        else:
+            self._change(off=[self.HELIUM_PORT])
 
-    @retry()
     def helium_leak_on(self):
-        self.relay.set_single(*self.HELIUM_LEAK_PORT)
+        self._change(on=[self.HELIUM_LEAK_PORT])
 
-    @retry()
     def helium_leak_off(self):
-        self.relay.del_single(*self.HELIUM_LEAK_PORT)
+        self._change(off=[self.HELIUM_LEAK_PORT])
 
-    @retry()
     def scroll_on(self):
-        self.relay.set_single(*self.SCROLL_PORT)
+        self._change(on=[self.SCROLL_PORT])
 
-    @retry()
     def scroll_off(self):
-        self.relay.del_single(*self.SCROLL_PORT)
+        self._change(off=[self.SCROLL_PORT])
 
-    @retry()
     def lamp_on(self):
-        self.relay.set_single(*self.LAMP_PORT)
+        self._change(on=[self.LAMP_PORT])
 
-    @retry()
     def lamp_off(self):
-        self.relay.del_single(*self.LAMP_PORT)
+        self._change(off=[self.LAMP_PORT])
 
-    @retry()
     def bypass_on(self):
-        self.relay.set_single(*self.BYPASS_PORT)
+        self._change(on=[self.BYPASS_PORT])
 
-    @retry()
     def bypass_off(self):
-        self.relay.del_single(*self.BYPASS_PORT)
+        self._change(off=[self.BYPASS_PORT])
 
     @retry()
     def off(self):
-        self.relay.set_port(self.RELAY_ADDRESS, 0)
+        with self._lock:
+            try:
+                self.relay.set_port(self.RELAY_ADDRESS, 0)
+            except BaseException:
+                self._shadow = None
+                raise
+
+            self._shadow = 0
+
+    def set_ports(self, on=(), off=()):
+        # i.e. set_ports(on=[RelayController.SCROLL_PORT, RelayController.BYPASS_PORT])
+        self._change(on, off)
 
-    @retry()
     def is_port_on(self, port):
-        return self.relay.get_port(self.RELAY_ADDRESS).get_response().get_port() & port[1] > 0
+        return self.get_port() & port[1] > 0
 
     def is_scroll_on(self):
         return self.is_port_on(self.SCROLL_PORT)
@@ -18,6 +18,7 @@ import time
 from devcontroller.misc.thread import CountdownThread
 from devcontroller.misc.logger import LoggerFactory
 from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.state import StateFile
 
 from e21_util.interface import Loggable
 from e21_util.serial_connection import SerialTimeoutException
@@ -37,6 +38,9 @@ class ShutterController(Loggable):
             open(), close(): opens/closes the shutter
             init(): Initializes the shutter to find the correct starting position
             reset(): Resets the shutter to the starting position (open() is then possible)
+
+        The status is saved after every move. On start, it is restored if the position counter of the motor still
+        matches the saved position, so init() is only required after the controller lost its position.
     """
 
     STATUS_UNKNOWN = 0
@@ -45,8 +49,9 @@ class ShutterController(Loggable):
     STATUS_CLOSED_RESET_REQUIRED = 3
 
     STEP_ANGLE = 1.8  # 1.8 degree per full step
+    HISTORY = 20
 
-    def __init__(self, shutter, logger, timer=None):
+    def __init__(self, shutter, logger, timer=None, state_file=None):
         super(ShutterController, self).__init__(logger)
         assert isinstance(shutter, TrinamicPD110Driver)
 
@@ -61,7 +66,14 @@ class ShutterController(Loggable):
 
         self.countdown_thread = None
 
+        self._position = None
+        self._history = []
+        self._state = None
+        if state_file is not None:
+            self._state = StateFile(state_file)
+
         self.initialize()
+        self._restore()
 
         print(self.DOC)
 
@@ -77,12 +89,56 @@ class ShutterController(Loggable):
     def get_driver(self):
         return self._driver
 
+    def get_status(self):
+        return self._status
+
+    def _read_position(self):
+        return int(self._driver.get_axis_parameter(Parameter.Axis.ACTUAL_POSITION).get_value())
+
+    def _restore(self):
+        if self._state is None:
+            return
+
+        state = self._state.load()
+        if state is None:
+            return
+
+        try:
+            position = self._read_position()
+        except Exception:
+            self._logger.exception("Could not read shutter position. Shutter needs init()")
+            return
+
+        if not position == state['position']:
+            self._logger.warning("Shutter position %s does not match saved position %s. Shutter needs init()",
+                                 str(position), str(state['position']))
+            return
+
+        self._status = state['status']
+        self._position = position
+        self._history = state.get('history', [])
+        self._logger.info("Restored shutter status %s at position %s", str(self._status), str(position))
+
+    def _save(self):
+        if self._state is None or self._position is None:
+            return
+
+        try:
+            self._state.save({'status': self._status, 'position': self._position,
+                              'history': self._history[-self.HISTORY:]})
+        except Exception:
+            self._logger.exception("Could not save shutter state")
+
+    def _set_status(self, status):
+        self._status = status
+        self._save()
+
     @retry()
     def stop(self):
         self._driver.stop()
 
     def set_closed(self):
-        self._status = self.STATUS_CLOSED
+        self._set_status(self.STATUS_CLOSED)
 
     def reset(self):
         self.stop()
@@ -90,7 +146,7 @@ class ShutterController(Loggable):
         self.initialize(10, 10)
         self._timer.sleep(0.3)
         self.move(49)
-        self._status = self.STATUS_CLOSED
+        self._set_status(self.STATUS_CLOSED)
         self._timer.sleep(7)
         self.initialize()
 
@@ -104,7 +160,11 @@ class ShutterController(Loggable):
         self._timer.sleep(7)
         self.initialize()
         print("done.")
-        self._status = self.STATUS_CLOSED
+        try:
+            self._position = self._read_position()
+        except Exception:
+            self._logger.exception("Could not read shutter position. State will not be saved")
+        self._set_status(self.STATUS_CLOSED)
 
     def move(self, degree):
         full_steps_for_full_rotation = 360.0 / self.STEP_ANGLE
@@ -112,13 +172,19 @@ class ShutterController(Loggable):
         # assuming motor is set to 1/64 micro steps
         full_rotation = full_steps_for_full_rotation * 64.0
 
+        steps = int(float(degree) / 360.0 * full_rotation)
+
         try:
-            self._driver.move(int(float(degree) / 360.0 * full_rotation))
+            self._driver.move(steps)
         except SerialTimeoutException:
             # It happens kind of often that the device does not respond
             # but it still moves ...
             pass
 
+        if self._position is not None:
+            self._position += steps
+            self._history.append((time.time(), degree))
+
     def countdown(self, t):
         thread = CountdownThread()
         thread.set_time(t)
@@ -139,12 +205,12 @@ class ShutterController(Loggable):
         if self._status == self.STATUS_UNKNOWN:
             raise RuntimeError("Cannot open shutter. Shutter is in unknown position")
 
-        self._status = self.STATUS_OPEN
+        self._set_status(self.STATUS_OPEN)
 
     def close(self):
         if self._status == self.STATUS_OPEN:
             self.move(-23)
-            self._status = self.STATUS_CLOSED_RESET_REQUIRED
+            self._set_status(self.STATUS_CLOSED_RESET_REQUIRED)
             self._timer.sleep(0.3)
 
         if self._status == self.STATUS_CLOSED_RESET_REQUIRED:
@@ -171,7 +237,7 @@ class ShutterController(Loggable):
 
             try:
                 self.move(-25)
-                self._status = self.STATUS_OPEN
+                self._set_status(self.STATUS_OPEN)
             except KeyboardInterrupt:
                 raise
             except Exception:
@@ -185,7 +251,7 @@ class ShutterController(Loggable):
 
         try:
             self.move(-23)
-            self._status = self.STATUS_CLOSED_RESET_REQUIRED
+            self._set_status(self.STATUS_CLOSED_RESET_REQUIRED)
             # wait one second until the shutter is closed
             self._timer.sleep(1)
         except Exception:
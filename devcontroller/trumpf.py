@@ -53,8 +53,20 @@ class TruPlasmaDC3000Controller(object):
             get_last_sputter_response(): returns the last response from the sputter device (contains power, current and voltage)
             turn_on(): sputters with previously set values
             turn_off(): turns sputtering off
+            get_parameters(): returns a ParameterSet with all known channels (thresholds, long ramp)
+            apply_parameters(parameters): writes only the channels which differ from the device
+            save_parameters(name, parameters=None): stores a named parameter set (default: current device values)
+            load_parameters(name): returns a stored parameter set, apply_parameters(load_parameters(name)) applies it
     """
 
+    # name, type. The values are read/written with get_<name>/set_<name>
+    PARAMETERS = [
+        ('voltage_on_threshold', float),
+        ('voltage_off_threshold', float),
+        ('voltage_arc_threshold', float),
+        ('long_ramp', int),
+    ]
+
     def __init__(self, sputter=None, logger=None):
         if logger is None:
             logger = LoggerFactory().get_trumpf_sputter_logger()
@@ -176,6 +188,39 @@ class TruPlasmaDC3000Controller(object):
 
         return self.driver.set_byte(self.BYTE_CHANNEL_LONG_RAMP, ramp_type)
 
+    def get_parameters(self):
+        return ParameterSet(dict((name, type(getattr(self, 'get_' + name)())) for name, type in self.PARAMETERS))
+
+    def apply_parameters(self, parameters, current=None):
+        if not isinstance(parameters, ParameterSet):
+            parameters = ParameterSet(parameters)
+
+        if current is None:
+            current = self.get_parameters()
+
+        changed = current.diff(parameters)
+
+        for name in changed:
+            self.logger.info("Setting %s from %s to %s", name, str(current.get(name)), str(parameters.get(name)))
+            getattr(self, 'set_' + name)(parameters.get(name))
+
+        return changed
+
+    def save_parameters(self, name, parameters=None):
+        if parameters is None:
+            parameters = self.get_parameters()
+
+        if not isinstance(parameters, ParameterSet):
+            parameters = ParameterSet(parameters)
+
+        self.cache.put('parameters_' + name, parameters.to_dict())
+
+    def load_parameters(self, name):
+        if not 'parameters_' + name in self.cache:
+            raise KeyError("No parameter set named %s" % name)
+
+        return ParameterSet(self.cache.get('parameters_' + name))
+
     def get_current_voltage(self):
         return self.get_last_sputter_response().get_voltage()
 
@@ -183,6 +228,41 @@ class TruPlasmaDC3000Controller(object):
         return self.get_last_sputter_response().get_power()
 
 
+class ParameterSet(object):
+    TOLERANCE = 1e-6
+
+    def __init__(self, values):
+        names = [name for name, type in TruPlasmaDC3000Controller.PARAMETERS]
+
+        for name in values:
+            if name not in names:
+                raise KeyError("Unknown parameter %s" % name)
+
+        self._values = dict(values)
+
+    def get(self, name):
+        return self._values.get(name)
+
+    def names(self):
+        return [name for name, type in TruPlasmaDC3000Controller.PARAMETERS if name in self._values]
+
+    def diff(self, other):
+        # returns the names of the parameters in other, which differ from this set
+        changed = []
+        for name in other.names():
+            value, new = self.get(name), other.get(name)
+            if value is None or abs(new - value) > self.TOLERANCE * max(1.0, abs(value)):
+                changed.append(name)
+
+        return changed
+
+    def to_dict(self):
+        return dict(self._values)
+
+    def __str__(self):
+        return ", ".join("%s=%s" % (name, self._values[name]) for name in self.names())
+
+
 class SputterThread(StoppableThread):
     def set_driver(self, driver):
         self.driver = driver
@@ -13,13 +13,23 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+import threading
+
+from math import log
+from collections import deque
+
 from stp_ix455.factory import STPPumpFactory
 from stp_ix455.messages.SetOptionFunc import SetOptionFuncMessage
 from tpg26x.driver import PfeifferTPG26xDriver
 from tpg26x.factory import PfeifferTPG26xFactory
 
+from devcontroller.misc.error import ExecutionError
 from devcontroller.misc.logger import LoggerFactory
-from devcontroller.relay import RelaisController
+from devcontroller.misc.session import NestedSession
+from devcontroller.misc.thread import ControlLoopThread
+from devcontroller.misc.fit import linear_fit, plateau_fit
+from devcontroller.relay import RelayController
 
 class TurboController(object):
 
@@ -33,6 +43,8 @@ class TurboController(object):
             turn_on(): Turns the pump on
             turn_off(): Turns the pump off
             get_rotation_speed(): Returns the rotation speed in rpm.
+            remote(): Context manager, which switches the pump once to remote operation and back to local operation
+                      afterwards (also on errors), i.e. with turbo.remote(): ...
 
     """
 
@@ -48,6 +60,9 @@ class TurboController(object):
         else:
             self.pump = pump
 
+        self._options = {}
+        self._remote = NestedSession(self._to_remote_operation, self._to_local_operation, self.pump)
+
         print(self.DOC)
             
     def get_driver(self):
@@ -66,38 +81,41 @@ class TurboController(object):
         # Always switch back to local operation mode (i.e. the power supply), in case of
         # an error, one can always shut down the pump via the pressing a button on the power supply...
         try:
-            self._to_remote_operation()
-            self.pump.start()
+            with self.remote():
+                self.pump.start()
         except Exception as e:
             self.logger.exception("Error while starting pump")
             return False
-        finally:
-            self._to_local_operation()
             
     def turn_off(self):
         try:
-            self._to_remote_operation()
-            self.pump.stop()
+            with self.remote():
+                self.pump.stop()
         except Exception as e:
             self.logger.exception("Error while stopping pump")
             return False
-        finally:
-            self._to_local_operation()
+
+    def remote(self):
+        return self._remote
             
     def get_rotation_speed(self):
         return self.pump.get_rotation().get_rotation_speed()
         
+    def _get_options(self, mode):
+        if mode not in self._options:
+            opts = self.pump.prepare_options()
+            opts.set_remote_operation_mode(mode)
+            self._options[mode] = opts
+
+        return self._options[mode]
+
     def _to_remote_operation(self):
         self.logger.debug("Switching pump to remote operation mode")
-        opts = self.pump.prepare_options()
-        opts.set_remote_operation_mode(SetOptionFuncMessage.REMOTE_OPERATION_MODE_X3)
-        self.pump.set_options(opts)
+        self.pump.set_options(self._get_options(SetOptionFuncMessage.REMOTE_OPERATION_MODE_X3))
         
     def _to_local_operation(self):
         self.logger.debug("Switching pump to local operation mode")
-        opts = self.pump.prepare_options()
-        opts.set_remote_operation_mode(SetOptionFuncMessage.REMOTE_OPERATION_MODE_POWER_SUPPLY)
-        self.pump.set_options(opts)
+        self.pump.set_options(self._get_options(SetOptionFuncMessage.REMOTE_OPERATION_MODE_POWER_SUPPLY))
 
 class TurboSafeController(TurboController):
 
@@ -106,13 +124,21 @@ class TurboSafeController(TurboController):
 
         Usage:
             set_gauge(gauge [PfeifferTPG26xDriver]): Sets the gauge. (Can be accessed via get_gauge())
-            set_relais(relais [RelaisController]): Sets the relais. (Can be accessed via get_relais())
+            set_relais(relais [RelayController]): Sets the relais. (Can be accessed via get_relais())
             start(): Turns the pump on - ONLY if the pressure is okay, and the scroll pump is on (via relais)
+            force(): Skips the checks for the next start()
             stop(): Turns the pump off
             get_rotation_speed(): Returns the rotation speed in rpm.
     """
 
+    # The pump is only started below this pressure [mbar]
+    MAX_START_PRESSURE = 0.001
+
     def __init__(self, pump=None, gauge=None, relais=None, logger=None):
+        # the relay controller needs the driver and logger of the setup, so it cannot be created here
+        if relais is None:
+            raise ValueError("A RelayController is required to check the scroll pump")
+
         super(TurboSafeController, self).__init__(pump, logger)
         
         if gauge is not None:
@@ -120,12 +146,9 @@ class TurboSafeController(TurboController):
         else:
             self.set_gauge(PfeifferTPG26xFactory().create_gauge())
             
-        if relais is not None:
-            self.set_relais(relais)
-        else:
-            self.set_relais(RelaisController())
-            
-        self.force = False
+        self.set_relais(relais)
+
+        self._force = False
 
         print(self.DOC)
     
@@ -139,7 +162,7 @@ class TurboSafeController(TurboController):
         return self.gauge
     
     def set_relais(self, relais):
-        if not isinstance(relais, RelaisController):
+        if not isinstance(relais, RelayController):
             raise TypeError()
             
         self.relais = relais
@@ -155,7 +178,7 @@ class TurboSafeController(TurboController):
         try:
             reading, pressure = self.gauge.get_pressure_measurement()
             
-            if pressure > 0.001:
+            if pressure > self.MAX_START_PRESSURE:
                 self.logger.error("Pressure is too high: %s", str(pressure))
                 return False
             
@@ -183,7 +206,7 @@ class TurboSafeController(TurboController):
         return True
             
     def start(self):
-        if not self.force:
+        if not self._force:
             if not self.check_pressure():
                 self.logger.error("Will not start the pump, since the pressure is not in range")
                 return False
@@ -194,10 +217,194 @@ class TurboSafeController(TurboController):
         
         self.unforce()
 
-        return super(TurboSafeController, self).start()
+        return super(TurboSafeController, self).turn_on()
 
     def force(self):
-        self.force = True
+        self._force = True
     
     def unforce(self):
-        self.force = False
\ No newline at end of file
+        self._force = False
+
+
+class SpeedFuture(object):
+    def __init__(self):
+        self._event = threading.Event()
+        self._eta = None
+        self._speed = None
+        self._error = None
+
+    def wait(self, timeout=None):
+        # returns True if the pump reached the desired state
+        self._event.wait(timeout)
+        return self._event.is_set() and self._error is None
+
+    def is_done(self):
+        return self._event.is_set()
+
+    def get_eta(self):
+        # estimated seconds until the pump reaches the desired state, None if unknown
+        return self._eta
+
+    def get_speed(self):
+        return self._speed
+
+    def get_error(self):
+        return self._error
+
+    # update() and finish() are called by the TurboSpeedMonitor
+
+    def update(self, speed, eta):
+        self._speed = speed
+        self._eta = eta
+
+    def finish(self, error=None):
+        self._error = error
+        self._eta = 0 if error is None else None
+        self._event.set()
+
+
+class TurboSpeedMonitor(object):
+    DOC = """
+        TurboSpeedMonitor - Watches the rotation speed while the turbo pump spins up or runs down
+
+        Usage:
+            spin_up(target_speed=None [rpm]): Returns a SpeedFuture, which is done once target_speed is reached.
+                                              Without target_speed, it is done once the speed stops increasing.
+                                              The ETA is then extrapolated from the fitted approach to full speed
+            run_down(standstill=0 [rpm]): Returns a SpeedFuture, which is done once the pump is at standstill
+            stop(): Stops watching. A pending SpeedFuture is finished with an error
+            get_samples(): Returns the list of (time, speed [rpm]) of the current watch
+            get_acceleration(): Returns the fitted acceleration [rpm/s] over the recent samples
+            get_plateau(): Returns the extrapolated full speed [rpm] and time constant [s], or None
+
+        SpeedFuture: wait(timeout) -> True if reached, is_done(), get_eta() [s], get_speed() [rpm], get_error()
+    """
+
+    # The watch is aborted after this many failed readings in a row
+    MAX_READ_FAILURES = 3
+
+    def __init__(self, turbo, interval=1.0, window=30, logger=None):
+        if logger is None:
+            logger = turbo.get_logger()
+
+        self._turbo = turbo
+        self._logger = logger
+        self._interval = interval
+        self._window = window
+        self._samples = []
+        self._recent = deque(maxlen=window)
+        self._thread = None
+        self._future = None
+        self._target = None
+        self._spin_up = True
+        self._failures = 0
+
+    def spin_up(self, target_speed=None):
+        return self._watch(True, target_speed)
+
+    def run_down(self, standstill=0):
+        return self._watch(False, standstill)
+
+    def _watch(self, spin_up, target):
+        self.stop()
+
+        self._spin_up = spin_up
+        self._target = target
+        self._samples = []
+        self._recent.clear()
+        self._failures = 0
+        self._future = SpeedFuture()
+
+        self._thread = ControlLoopThread()
+        self._thread.daemon = True
+        self._thread.set_loop(self._sample, self._interval, self._logger)
+        self._thread.start()
+
+        return self._future
+
+    def stop(self):
+        if self._thread is not None:
+            self._thread.stop()
+
+        # nobody waits forever for a watch that was given up
+        if self._future is not None and not self._future.is_done():
+            self._future.finish(ExecutionError("Watching the turbo pump was stopped"))
+
+        self._thread = None
+
+    def get_samples(self):
+        return self._samples
+
+    def get_acceleration(self):
+        if len(self._recent) < 2:
+            return None
+
+        times, speeds = zip(*self._recent)
+        return linear_fit(times, speeds).slope
+
+    def get_plateau(self):
+        if len(self._recent) < 3:
+            return None
+
+        times, speeds = zip(*self._recent)
+        return plateau_fit(times, speeds)
+
+    def _plateau_eta(self, speed):
+        # The pump counts as up to speed, once the speed changes by less than 1% over the window. Close to full
+        # speed, the remaining difference decays with the time constant tau.
+        plateau = self.get_plateau()
+        if plateau is None:
+            return None
+
+        full_speed, tau = plateau
+        threshold = 0.01 * full_speed * tau / (self._window * self._interval)
+        if full_speed - speed <= threshold:
+            return 0.0
+
+        return tau * log((full_speed - speed) / threshold)
+
+    def _sample(self):
+        now = time.time()
+
+        try:
+            speed = self._turbo.get_rotation_speed()
+        except Exception as e:
+            self._failures += 1
+            if self._failures < self.MAX_READ_FAILURES:
+                raise
+
+            self._logger.error("Could not read the turbo rotation speed %s times in a row", self._failures)
+            self._future.finish(ExecutionError("Could not read the rotation speed: %s" % str(e)))
+            self._thread.stop()
+            return
+
+        self._failures = 0
+
+        self._samples.append((now, speed))
+        self._recent.append((now, speed))
+
+        acceleration = self.get_acceleration()
+        eta = None
+
+        if self._spin_up:
+            if self._target is not None:
+                reached = speed >= self._target
+            else:
+                # full speed is reached, once the pump does not accelerate anymore
+                reached = len(self._recent) == self._window and speed > 0 and acceleration is not None \
+                          and abs(acceleration) * self._window * self._interval < 0.01 * speed
+            if not reached and self._target is not None and acceleration is not None and acceleration > 0:
+                eta = (self._target - speed) / acceleration
+            elif not reached and self._target is None:
+                eta = self._plateau_eta(speed)
+        else:
+            reached = speed <= self._target
+            if not reached and acceleration is not None and acceleration < 0:
+                eta = (self._target - speed) / acceleration
+
+        self._future.update(speed, eta)
+
+        if reached:
+            self._logger.info("Turbo pump reached %s rpm after %.1f s", str(speed), now - self._samples[0][0])
+            self._future.finish()
+            self._thread.stop()
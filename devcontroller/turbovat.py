@@ -14,6 +14,7 @@
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
 from devcontroller.misc.logger import LoggerFactory
+from devcontroller.misc.session import NestedSession
 from vat_641.factory import VAT641Factory
 from vat_641.driver import VAT641Driver
 
@@ -32,6 +33,8 @@ class TurboVATController(Loggable):
             get_open(): Return the percentage of the valve position. 100^= open, 0^= close
             set_speed(speed [0-1000]): Sets the speed for opening and closing the valve
             set_position(pos [0-1000]): Sets the position: 1000 ^= open, 0^= close
+            remote(): Context manager, which switches the valve once to remote mode and back to local mode
+                      afterwards (also on errors), i.e. with turbovalve.remote(): ...
     """
 
     def __init__(self, valve=None, logger=None):
@@ -46,6 +49,8 @@ class TurboVATController(Loggable):
         else:
             self.valve = valve
 
+        self._remote = NestedSession(self._to_remote, self._to_local, self.valve)
+
         print(self.DOC)
 
     @retry()
@@ -56,26 +61,26 @@ class TurboVATController(Loggable):
     def _to_local(self):
         self.valve.switch_to_local_mode()
 
+    def remote(self):
+        return self._remote
+
     def get_driver(self):
         return self.valve
 
     @retry()
     def open(self):
-        self._to_remote()
-        self.valve.open()
-        self._to_local()
+        with self.remote():
+            self.valve.open()
 
     @retry()
     def close(self):
-        self._to_remote()
-        self.valve.close()
-        self._to_local()
+        with self.remote():
+            self.valve.close()
 
     @retry()
     def hold(self):
-        self._to_remote()
-        self.valve.hold()
-        self._to_local()
+        with self.remote():
+            self.valve.hold()
 
     @retry()
     def get_open(self):
@@ -87,15 +92,13 @@ class TurboVATController(Loggable):
 
     @retry()
     def set_speed(self, speed):
-        self._to_remote()
-        self.valve.set_speed(speed)
-        self._to_local()
+        with self.remote():
+            self.valve.set_speed(speed)
 
     @retry()
     def set_position(self, position):
-        self._to_remote()
-        self.valve.position(position)
-        self._to_local()
+        with self.remote():
+            self.valve.position(position)
 
     @retry()
     def get_position(self):
@@ -13,12 +13,19 @@
 # You should have received a copy of the GNU General Public License
 # along with this program.  If not, see <http://www.gnu.org/licenses/>.
 
+import time
+import threading
+
 from math import log10
 
 from vat_590.driver import VAT590Driver
 from tpg26x.driver import PfeifferTPG26xDriver
 
 from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.calibration import PressureCalibration
+from devcontroller.misc.pid import PID
+from devcontroller.misc.state import StateFile
+from devcontroller.misc.thread import ControlLoopThread
 
 from e21_util.error import ErrorResponse
 from e21_util.retry import retry
@@ -35,10 +42,29 @@ class VATController(Loggable):
             hold(): Holds the current open-status of the valve
             get_pressure() [mbar]: Returns the current pressure of the valve in mbar.
             set_pressure(pressure [mbar]): Sets the pressure for the valve in mbar.
+            write_setpoint(pressure [mbar]): Only writes the setpoint, without the check against the reference gauge.
+                For fast control loops, after the first setpoint was set with set_pressure()
             calibrate(): Calibrates the pressure with the Pfeiffer Gauge
+            calibrate_curve(pressures [mbar], settle_time [s]): Calibrates the pressure at several setpoints with the
+                Pfeiffer Gauge. The correction is saved and applied to all conversions from now on.
+            clear_calibration_curve(): Removes the multi-point calibration
+            voltages_to_pressures(voltages): Converts a list of sensor voltages into pressures [mbar]
+            regulate(pressure [mbar]): Sets the pressure and trims the setpoint continuously with the Pfeiffer Gauge
+            stop_regulation(): Stops the regulation, the valve keeps its last setpoint
+            wait_until_stable(tolerance [relative], hold_time [s], timeout [s]): Waits until the reference pressure
+                stays within tolerance of the set pressure for hold_time seconds. Returns False on timeout
     """
 
-    def __init__(self, valve, reference_gauge, logger):
+    # Setpoints above this pressure [mbar] are only accepted with force=True
+    MAX_PRESSURE = 1e-1
+
+    # The setpoint trimmed by regulate() stays below this pressure [mbar]
+    MAX_TRIMMED_PRESSURE = 0.9 * MAX_PRESSURE
+
+    # Readings for the plausibility check in set_pressure may be this old [s]
+    REFERENCE_MAX_AGE = 2.0
+
+    def __init__(self, valve, reference_gauge, logger, calibration_file=None, reference_sampler=None):
         super(VATController, self).__init__(logger)
 
         assert isinstance(valve, VAT590Driver)
@@ -46,9 +72,30 @@ class VATController(Loggable):
 
         self._gauge = reference_gauge
         self._driver  = valve
+        self._sampler = reference_sampler
+        self._vat_sample = None
+        self.reference_max_age = self.REFERENCE_MAX_AGE
         
         self._pressure_range = 0
         self._sensor_offset = 0
+
+        self._target = None
+        # held by a regulation cycle, and by everything that changes the setpoint or stops the regulation
+        self._step_lock = threading.RLock()
+        self._regulation = None
+        self._regulation_period = None
+        self._pid = None
+        self._stable_since = None
+        self._stable_tolerance = None
+
+        self._calibration = None
+        self._calibration_file = None
+        if calibration_file is not None:
+            self._calibration_file = StateFile(calibration_file)
+            data = self._calibration_file.load()
+            if data is not None:
+                self._calibration = PressureCalibration.from_dict(data)
+
         self.initialize()
 
         print(self.DOC)
@@ -66,7 +113,20 @@ class VATController(Loggable):
         #   d is a constant, namely d = 11.33
 
         #volt = voltage / ( self._pressure_range / 10.0)  + self._sensor_offset
-        return pow(10, 1.667 * voltage - 11.33)
+        pressure = pow(10, 1.667 * voltage - 11.33)
+
+        if self._calibration is not None:
+            pressure = self._calibration.correct(pressure)
+
+        return pressure
+
+    def voltages_to_pressures(self, voltages):
+        pressures = [pow(10, 1.667 * voltage - 11.33) for voltage in voltages]
+
+        if self._calibration is not None:
+            pressures = self._calibration.correct_all(pressures)
+
+        return pressures
 
     """
         Converts a pressure [mbar] into a voltage.
@@ -76,6 +136,9 @@ class VATController(Loggable):
         # voltage U [V] = c + 0.6* log_10(p)   where
         # c = 6.8 a constant
         # p the given pressure in [mbar]
+        if self._calibration is not None:
+            pressure = self._calibration.uncorrect(pressure)
+
         return 6.8 + 0.6 * log10(pressure)
 
     #def pressure_to_voltage(self, pressure):
@@ -84,7 +147,9 @@ class VATController(Loggable):
 
     @retry()
     def get_pressure(self):
-        return self.voltage_to_pressure(self.get_voltage())
+        pressure = self.voltage_to_pressure(self.get_voltage())
+        self._vat_sample = (pressure, time.time())
+        return pressure
         #return self._voltage_to_pressure(float(self._driver.get_pressure())/(self._pressure_range/10.0) + self._sensor_offset)
 
     @retry()
@@ -94,12 +159,12 @@ class VATController(Loggable):
     @retry()
     def set_pressure(self, pressure, force=False):
         # pressure in mbar
-        if pressure >= 1e-1 and not force:
-            raise ValueError("Will not set pressure higher than 1E-1 mbar.")
+        if pressure >= self.MAX_PRESSURE and not force:
+            raise ValueError("Will not set pressure higher than %s mbar." % str(self.MAX_PRESSURE))
 
         try:
-            p_ref = self._gauge.get_pressure()
-            p_vat = self.get_pressure()
+            p_ref = self.get_reference_pressure(self.reference_max_age)
+            p_vat = self._get_recent_pressure(self.reference_max_age)
         except Exception as e:
             self._logger.exception(e)
             raise ExecutionError("Could not check for correct pressure reading. See log files")
@@ -109,12 +174,121 @@ class VATController(Loggable):
         if abs(p_vat / p_ref - 1.0) > relative_tolerance:
             raise ExecutionError("Reference pressure (%s) and VAT pressure (%s) differ more than 5%%!" % (str(p_ref), str(p_vat)))
 
+        with self._step_lock:
+            self._write_pressure(pressure)
+            self._target = pressure
+
+            # a new setpoint during regulation: the loop must not keep the trim it integrated for the old one
+            if self._pid is not None and self.is_regulating():
+                self._pid.reset()
+                self._pid.set_setpoint(log10(pressure))
+                self._stable_since = None
+
+    def get_reference_pressure(self, max_age=None):
+        if self._sampler is None:
+            return self._gauge.get_pressure()
+
+        return self._sampler.get_pressure(max_age)
+
+    def _get_recent_pressure(self, max_age):
+        if self._vat_sample is not None and time.time() - self._vat_sample[1] <= max_age:
+            return self._vat_sample[0]
+
+        return self.get_pressure()
+
+    def _write_pressure(self, pressure):
         self._driver.clear()
 
         voltage = int(self.pressure_to_voltage(pressure)*self._pressure_range/10.0)
 
         self._driver.set_pressure(voltage)
 
+    def write_setpoint(self, pressure):
+        if pressure >= self.MAX_PRESSURE:
+            raise ValueError("Will not set pressure higher than %s mbar." % str(self.MAX_PRESSURE))
+
+        with self._step_lock:
+            self._write_pressure(pressure)
+            self._target = pressure
+
+    def get_target_pressure(self):
+        return self._target
+
+    def regulate(self, pressure, kp=0.5, ki=0.05, period=1.0, max_trim=0.5):
+        # The loop works on the logarithm of the pressure. Its output is a correction (in decades, at most max_trim)
+        # of the setpoint sent to the valve.
+        self.stop_regulation()
+        self.set_pressure(pressure)
+
+        self._pid = PID(kp, ki, 0.0, -max_trim, max_trim)
+        self._pid.set_setpoint(log10(pressure))
+        self._stable_since = None
+
+        self._regulation = ControlLoopThread()
+        self._regulation.daemon = True
+        self._regulation_period = period
+        self._regulation.set_loop(self._regulation_step, period, self._logger)
+        self._regulation.start()
+
+    def stop_regulation(self):
+        if self._regulation is not None:
+            self._regulation.stop()
+
+            # wait for a running cycle, so that it does not write a trimmed setpoint after we return
+            with self._step_lock:
+                self._logger.info("Stopped pressure regulation: %s", str(self._regulation.get_timing()))
+
+        self._regulation = None
+
+    def is_regulating(self):
+        return self._regulation is not None and self._regulation.is_running()
+
+    def _regulation_step(self):
+        with self._step_lock:
+            # stop_regulation() was called while this cycle was waiting
+            if not self.is_regulating():
+                return
+
+            reference = self.get_reference_pressure(self._regulation_period)
+            self._update_stability(reference)
+
+            trim = self._pid.update(log10(reference))
+            setpoint = min(self._target * pow(10, trim), self.MAX_TRIMMED_PRESSURE)
+
+            self._write_pressure(setpoint)
+
+    def _update_stability(self, reference):
+        if self._stable_tolerance is None or self._target is None:
+            return
+
+        if abs(reference / self._target - 1.0) <= self._stable_tolerance:
+            if self._stable_since is None:
+                self._stable_since = time.time()
+        else:
+            self._stable_since = None
+
+    def wait_until_stable(self, tolerance=0.05, hold_time=5.0, timeout=None, poll=0.5):
+        if self._target is None:
+            raise ExecutionError("No pressure set. Cannot wait for a stable pressure")
+
+        start = time.time()
+        self._stable_tolerance = tolerance
+        self._stable_since = None
+
+        while timeout is None or time.time() - start < timeout:
+            # while regulating, the control loop reads the reference gauge for us
+            if not self.is_regulating():
+                self._update_stability(self.get_reference_pressure(poll))
+
+            if self._stable_since is not None and time.time() - self._stable_since >= hold_time:
+                self._logger.info("Pressure stable at %s mbar after %.1f s", str(self._target), time.time() - start)
+                return True
+
+            time.sleep(poll)
+
+        self._logger.warning("Pressure did not get stable within %s s", str(timeout))
+        return False
+
     @retry()
     def set_pressure_alignment(self, pressure):
 
@@ -163,7 +337,50 @@ class VATController(Loggable):
         self._driver.hold()
 
     def calibrate(self):
-        pressure = self._gauge.get_pressure()
+        pressure = self.get_reference_pressure(0)
         print("Pfeiffer pressure: %s" % str(pressure))
         self.set_pressure_alignment(pressure)
 
+    def get_calibration(self):
+        return self._calibration
+
+    def clear_calibration_curve(self):
+        self._calibration = None
+        if self._calibration_file is not None:
+            self._calibration_file.delete()
+
+    def calibrate_curve(self, pressures, settle_time=30, samples=5):
+        # the valve has to be driven with the uncorrected conversion
+        previous = self._calibration
+        self._calibration = None
+        calibration = PressureCalibration()
+        finished = False
+
+        try:
+            for pressure in sorted(pressures):
+                self.set_pressure(pressure)
+                time.sleep(settle_time)
+
+                # max_age=0: every sample is a fresh reading, also if the gauge is shared with a sampler
+                vat, reference = 0.0, 0.0
+                for i in range(samples):
+                    vat += self.get_pressure() / samples
+                    reference += self.get_reference_pressure(0) / samples
+
+                print("VAT pressure: %s, Pfeiffer pressure: %s" % (str(vat), str(reference)))
+                calibration.add_point(vat, reference)
+
+            calibration.fit()
+            finished = True
+        finally:
+            if not finished:
+                self._calibration = previous
+
+            self.hold()
+
+        self._calibration = calibration
+
+        if self._calibration_file is not None:
+            self._calibration_file.save(calibration.to_dict())
+
+        return calibration
@@ -0,0 +1,57 @@
+import unittest
+
+from devcontroller.misc.calibration import PressureCalibration
+
+
+class PressureCalibrationTest(unittest.TestCase):
+    def _calibration(self, points):
+        calibration = PressureCalibration()
+        for pressure, reference in points:
+            calibration.add_point(pressure, reference)
+        calibration.fit()
+        return calibration
+
+    def test_interpolation(self):
+        # the VAT sensor reads a factor of 2 too low at 1e-4 mbar and correct at 1e-2 mbar
+        calibration = self._calibration([(1e-4, 2e-4), (1e-2, 1e-2)])
+
+        self.assertAlmostEqual(calibration.correct(1e-4), 2e-4)
+        self.assertAlmostEqual(calibration.correct(1e-2), 1e-2)
+        # halfway in log(pressure): half the offset in decades
+        self.assertAlmostEqual(calibration.correct(1e-3), 1e-3 * 2 ** 0.5)
+
+    def test_extrapolation_keeps_outer_offset(self):
+        calibration = self._calibration([(1e-4, 2e-4), (1e-2, 1e-2)])
+
+        self.assertAlmostEqual(calibration.correct(1e-6), 2e-6)
+        self.assertAlmostEqual(calibration.correct(1e-1), 1e-1)
+
+    def test_inverse(self):
+        calibration = self._calibration([(1e-5, 3e-5), (1e-4, 2e-4), (1e-3, 1e-3), (1e-2, 8e-3)])
+
+        for pressure in [3e-6, 1e-5, 5e-5, 2e-4, 7e-3, 5e-2]:
+            self.assertAlmostEqual(calibration.uncorrect(calibration.correct(pressure)) / pressure, 1.0)
+
+    def test_pool_adjacent_violators(self):
+        # the second point reads a lower reference than the first one, both are pooled into one monotone block
+        calibration = self._calibration([(1e-4, 4e-4), (2e-4, 1e-4), (1e-2, 1e-2)])
+
+        corrected = calibration.correct_all([1e-4, 1.5e-4, 2e-4, 1e-3, 1e-2])
+        for low, high in zip(corrected, corrected[1:]):
+            self.assertLessEqual(low, high)
+
+        self.assertAlmostEqual(calibration.correct(2 ** 0.5 * 1e-4), 2e-4)
+
+    def test_no_points(self):
+        self.assertRaises(ValueError, PressureCalibration().fit)
+
+    def test_dict_roundtrip(self):
+        calibration = self._calibration([(1e-4, 2e-4), (1e-2, 1e-2)])
+        restored = PressureCalibration.from_dict(calibration.to_dict())
+
+        self.assertAlmostEqual(restored.correct(1e-3), calibration.correct(1e-3))
+        self.assertEqual(len(restored.get_points()), 2)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,103 @@
+import logging
+import time
+import unittest
+
+import pytest
+
+pytest.importorskip('e21_util')
+
+from devcontroller.cryo import CryoSequencer
+from devcontroller.misc.error import ExecutionError
+
+
+class FakeCompressor(object):
+    def __init__(self):
+        self.on = False
+
+    def turn_on(self):
+        self.on = True
+
+    def turn_off(self):
+        self.on = False
+
+    def is_on(self):
+        return self.on
+
+
+class FakeRelay(object):
+    def __init__(self):
+        self.helium = False
+        self.leak = False
+
+    def helium_on(self):
+        self.helium, self.leak = True, False
+
+    def helium_off(self, leak=False):
+        self.helium, self.leak = False, leak
+
+    def is_helium_on(self):
+        return self.helium
+
+    def is_helium_leak_on(self):
+        return self.leak
+
+
+class FakeLakeshore(object):
+    def __init__(self, temperature):
+        self.temperature = temperature
+
+    def get_temperature(self, input):
+        return self.temperature
+
+
+class CryoSequencerTest(unittest.TestCase):
+    def setUp(self):
+        self.compressor = FakeCompressor()
+        self.relay = FakeRelay()
+        self.lakeshore = FakeLakeshore(290)
+        self.pressure = 1e-6
+        self.cryo = CryoSequencer(self.compressor, self.relay, self.lakeshore, lambda: self.pressure,
+                                  logger=logging.getLogger('test_cryo'), timeouts={'cool-down': 1.0}, poll=0.01)
+
+    def _wait(self, timeout=2.0):
+        end = time.time() + timeout
+        while self.cryo.is_running() and time.time() < end:
+            time.sleep(0.01)
+
+    def test_background_cool_down(self):
+        self.cryo.start_cool_down(10)
+        time.sleep(0.05)
+        self.assertTrue(self.cryo.is_running())
+        self.assertRaises(ExecutionError, self.cryo.start_warm_up)
+
+        self.lakeshore.temperature = 9
+        self._wait()
+
+        self.assertFalse(self.cryo.is_running())
+        self.assertIsNone(self.cryo.get_error())
+        self.assertTrue(self.compressor.is_on())
+        self.assertTrue(self.relay.is_helium_on())
+
+    def test_stop_keeps_the_cryo_running(self):
+        self.cryo.start_cool_down(10)
+        time.sleep(0.05)
+        self.cryo.stop()
+        self._wait()
+
+        self.assertIsNone(self.cryo.get_error())
+        self.assertTrue(self.compressor.is_on())
+        self.assertTrue(self.relay.is_helium_on())
+
+    def test_pressure_rise_rolls_back(self):
+        self.cryo.start_cool_down(10)
+        time.sleep(0.05)
+        self.pressure = 1e-2
+        self._wait()
+
+        self.assertIsInstance(self.cryo.get_error(), ExecutionError)
+        self.assertFalse(self.compressor.is_on())
+        self.assertTrue(self.relay.is_helium_leak_on())
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,63 @@
+import unittest
+
+from math import exp
+
+from devcontroller.misc.fit import linear_fit, plateau_fit
+
+
+class LinearFitTest(unittest.TestCase):
+    def test_exact_line(self):
+        fit = linear_fit([0, 1, 2, 3], [1, 3, 5, 7])
+
+        self.assertAlmostEqual(fit.slope, 2.0)
+        self.assertAlmostEqual(fit.intercept, 1.0)
+        self.assertAlmostEqual(fit.residual, 0.0)
+        self.assertAlmostEqual(fit.evaluate(10), 21.0)
+        self.assertAlmostEqual(fit.solve(21), 10.0)
+        self.assertEqual(fit.count, 4)
+
+    def test_timestamps(self):
+        # large x values (unix timestamps) must not lose precision
+        t0 = 1.5e9
+        fit = linear_fit([t0, t0 + 1, t0 + 2], [10.0, 9.5, 9.0])
+
+        self.assertAlmostEqual(fit.slope, -0.5)
+        self.assertAlmostEqual(fit.evaluate(t0 + 20), 0.0)
+
+    def test_errors(self):
+        fit = linear_fit([0, 1, 2, 3], [0, 1.1, 1.9, 3.0])
+
+        self.assertGreater(fit.residual, 0)
+        self.assertGreater(fit.slope_error, 0)
+        self.assertGreater(fit.intercept_error, 0)
+
+    def test_flat(self):
+        fit = linear_fit([0, 1], [5, 5])
+        self.assertIsNone(fit.solve(1))
+
+    def test_invalid(self):
+        self.assertRaises(ValueError, linear_fit, [1], [1])
+        self.assertRaises(ValueError, linear_fit, [1, 2], [1])
+        self.assertRaises(ValueError, linear_fit, [1, 1], [1, 2])
+
+
+class PlateauFitTest(unittest.TestCase):
+    def test_exponential_approach(self):
+        times = [float(t) for t in range(100, 130)]
+        speeds = [1000.0 * (1 - exp(-t / 60.0)) for t in times]
+
+        plateau, tau = plateau_fit(times, speeds)
+
+        self.assertAlmostEqual(plateau / 1000.0, 1.0, places=2)
+        self.assertAlmostEqual(tau / 60.0, 1.0, places=2)
+
+    def test_constant_acceleration(self):
+        times = [float(t) for t in range(10)]
+        self.assertIsNone(plateau_fit(times, [20.0 * t for t in times]))
+
+    def test_too_few_points(self):
+        self.assertIsNone(plateau_fit([0.0, 1.0], [0.0, 1.0]))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,51 @@
+import time
+import threading
+import unittest
+
+from devcontroller.health import check_health, DeviceHealth
+
+
+class CheckHealthTest(unittest.TestCase):
+    def test_status(self):
+        def fail():
+            raise RuntimeError("offline")
+
+        report = check_health([('ok', lambda: 42), ('error', fail)], 1.0)
+
+        self.assertEqual(report.get('ok').get_status(), DeviceHealth.STATUS_OK)
+        self.assertEqual(report.get('ok').get_value(), 42)
+        self.assertEqual(report.get('error').get_status(), DeviceHealth.STATUS_ERROR)
+        self.assertFalse(report.is_ok())
+
+    def test_hanging_device_is_not_queried_again(self):
+        release = threading.Event()
+        calls = []
+
+        def hang():
+            calls.append(1)
+            release.wait(5)
+            return 'late'
+
+        running = {}
+        checks = [('hang', hang), ('ok', lambda: 1)]
+
+        report = check_health(checks, 0.1, running)
+        self.assertEqual(report.get('hang').get_status(), DeviceHealth.STATUS_TIMEOUT)
+        self.assertTrue(report.get('ok').is_ok())
+
+        report = check_health(checks, 0.1, running)
+        self.assertEqual(report.get('hang').get_status(), DeviceHealth.STATUS_BUSY)
+        self.assertEqual(len(calls), 1)
+
+        release.set()
+        while not running['hang'].is_done():
+            time.sleep(0.01)
+
+        report = check_health(checks, 1.0, running)
+        self.assertTrue(report.is_ok())
+        self.assertEqual(len(calls), 2)
+        self.assertEqual(running, {})
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+import unittest
+
+from devcontroller.misc.pid import PID
+
+
+class PIDTest(unittest.TestCase):
+    def _saturate_and_reverse(self, pid, saturating, reversing, steps=100):
+        pid.update(saturating, 0)
+        for t in range(1, steps):
+            self.assertEqual(pid.update(saturating, t), pid.output_max)
+
+        return pid.update(reversing, steps)
+
+    def test_no_windup(self):
+        pid = PID(0.5, 1.0, output_min=0.0, output_max=1.0)
+        pid.set_setpoint(1.0)
+
+        # error changes sign: the output has to leave the upper limit right away
+        self.assertLess(self._saturate_and_reverse(pid, 0.0, 2.0), 1.0)
+
+    def test_no_windup_negative_gains(self):
+        # reverse acting loop: the output increases, if the measurement is above the setpoint
+        pid = PID(-0.5, -1.0, output_min=0.0, output_max=1.0)
+        pid.set_setpoint(0.0)
+
+        self.assertLess(self._saturate_and_reverse(pid, 1.0, -1.0), 1.0)
+
+    def test_integral_leaves_saturation(self):
+        pid = PID(0.0, -1.0, output_min=0.0, output_max=1.0, bias=2.0)
+        pid.set_setpoint(0.0)
+
+        # saturated high, but the integral pulls the output down and must not be frozen
+        pid.update(-1.0, 0)
+        self.assertEqual(pid.update(-1.0, 1), 1.0)
+        self.assertEqual(pid.update(-1.0, 2), 0.0)
+
+    def test_limits(self):
+        pid = PID(10.0, output_min=-1.0, output_max=1.0)
+        pid.set_setpoint(0.0)
+
+        self.assertEqual(pid.update(-5.0, 0), 1.0)
+        self.assertEqual(pid.update(5.0, 1), -1.0)
+        self.assertAlmostEqual(pid.update(0.05, 2), -0.5)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,81 @@
+import logging
+import unittest
+
+import pytest
+
+pytest.importorskip('e21_util')
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.pressure import PressureEstimator, PressureSource
+
+
+class FakeGauge(object):
+    def __init__(self, pressure):
+        self.pressure = pressure
+
+    def read(self):
+        if isinstance(self.pressure, Exception):
+            raise self.pressure
+        return self.pressure
+
+
+class PressureEstimatorTest(unittest.TestCase):
+    def _estimator(self, sources, **kwargs):
+        return PressureEstimator(sources, timeout=1.0, logger=logging.getLogger('test_pressure'), **kwargs)
+
+    def test_combines_sources(self):
+        gauge, vat = FakeGauge(1e-3), FakeGauge(1e-3)
+        estimator = self._estimator([PressureSource('gauge', gauge.read, 1e-9, 1000, 0.1),
+                                     PressureSource('vat', vat.read, 1e-9, 1000, 0.1)])
+
+        self.assertAlmostEqual(estimator.get_pressure() / 1e-3, 1.0)
+        estimate = estimator.get_estimate()
+        self.assertEqual(estimate.get_used(), ['gauge', 'vat'])
+        self.assertEqual(estimate.get_disagreeing(), [])
+        # two equal sources: sigma / sqrt(2)
+        self.assertAlmostEqual(estimate.get_uncertainty(), 0.1 / 2 ** 0.5)
+
+    def test_out_of_range_source_is_ignored(self):
+        gauge, ion_getter = FakeGauge(1e-3), FakeGauge(1e-3)
+        estimator = self._estimator([PressureSource('gauge', gauge.read, 1e-9, 1000, 0.1),
+                                     PressureSource('ion getter', ion_getter.read, 1e-11, 1e-5, 0.3)])
+
+        estimator.get_pressure()
+        self.assertEqual(estimator.get_estimate().get_used(), ['gauge'])
+
+    def test_stale_estimate_is_refreshed(self):
+        gauge = FakeGauge(1e-3)
+        estimator = self._estimator([PressureSource('gauge', gauge.read, 1e-9, 1000, 0.1)])
+        estimator.get_pressure()
+
+        gauge.pressure = 1e-6
+
+        # the readings no longer agree with the prediction, so the filter restarts from them
+        self.assertAlmostEqual(estimator.get_pressure(max_age=0) / 1e-6, 1.0)
+
+    def test_no_valid_reading(self):
+        gauge = FakeGauge(RuntimeError("offline"))
+        estimator = self._estimator([PressureSource('gauge', gauge.read, 1e-9, 1000, 0.1)])
+
+        self.assertRaises(ExecutionError, estimator.get_pressure)
+
+    def test_failing_sources_invalidate_the_estimate(self):
+        gauge = FakeGauge(1e-3)
+        estimator = self._estimator([PressureSource('gauge', gauge.read, 1e-9, 1000, 0.1)])
+        estimator.get_pressure()
+
+        gauge.pressure = None
+        estimate = estimator.update()
+
+        self.assertEqual(estimate.get_used(), [])
+        self.assertRaises(ExecutionError, estimator.get_pressure, 0)
+
+    def test_uncertainty_bound(self):
+        gauge = FakeGauge(1e-3)
+        estimator = self._estimator([PressureSource('gauge', gauge.read, 1e-9, 1000, 1.0)], max_uncertainty=0.5)
+
+        self.assertRaises(ExecutionError, estimator.get_pressure)
+
+
+if __name__ == '__main__':
+    unittest.main()
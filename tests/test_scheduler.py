@@ -0,0 +1,96 @@
+import time
+import logging
+import unittest
+
+import pytest
+
+# the scheduler logs through the LoggerFactory, which needs the lab utilities
+pytest.importorskip('e21_util')
+
+from devcontroller.misc.scheduler import Scheduler, ScheduledAction
+
+
+class SchedulerTest(unittest.TestCase):
+    def setUp(self):
+        self.scheduler = Scheduler(logging.getLogger('test_scheduler'))
+        self.calls = []
+
+    def tearDown(self):
+        for action in self.scheduler.list():
+            self.scheduler.cancel(action)
+        self.scheduler.stop()
+
+    def _wait(self, action, timeout=2.0):
+        end = time.time() + timeout
+        while action.is_pending() and time.time() < end:
+            time.sleep(0.01)
+
+    def test_execute(self):
+        action = self.scheduler.schedule(0.05, self.calls.append, 1, name='append')
+        self.assertEqual(action.get_name(), 'append')
+        self.assertTrue(action.is_pending())
+
+        self._wait(action)
+
+        self.assertEqual(action.get_status(), ScheduledAction.STATUS_DONE)
+        self.assertEqual(self.calls, [1])
+
+    def test_order(self):
+        second = self.scheduler.schedule(0.1, self.calls.append, 2)
+        first = self.scheduler.schedule(0.05, self.calls.append, 1)
+
+        self._wait(second)
+
+        self.assertEqual(self.calls, [1, 2])
+        self.assertEqual(self.scheduler.get(first.get_id()), first)
+
+    def test_cancel(self):
+        action = self.scheduler.schedule(0.05, self.calls.append, 1)
+        self.scheduler.cancel(action.get_id())
+
+        time.sleep(0.2)
+
+        self.assertEqual(action.get_status(), ScheduledAction.STATUS_CANCELLED)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(self.scheduler.list(), [])
+
+    def test_cancelled_action_is_not_executed(self):
+        # cancelled after the scheduler picked it as due
+        action = ScheduledAction(1, 'append', time.time(), self.calls.append, (1,), {})
+
+        self.assertTrue(action.cancel())
+        self.assertFalse(action.execute())
+        self.assertFalse(action.cancel())
+        self.assertEqual(self.calls, [])
+
+    def test_failure(self):
+        def fail():
+            raise RuntimeError("failed")
+
+        action = self.scheduler.schedule(0.0, fail)
+        self._wait(action)
+
+        self.assertEqual(action.get_status(), ScheduledAction.STATUS_FAILED)
+        self.assertIsInstance(action.get_error(), RuntimeError)
+
+        # the scheduler keeps running
+        action = self.scheduler.schedule(0.0, self.calls.append, 1)
+        self._wait(action)
+        self.assertEqual(self.calls, [1])
+
+    def test_at_exit(self):
+        run = self.scheduler.schedule(100, self.calls.append, 'heater off', run_at_exit=True)
+        kept = self.scheduler.schedule(100, self.calls.append, 'other')
+
+        self.scheduler._at_exit()
+
+        self.assertEqual(self.calls, ['heater off'])
+        self.assertEqual(run.get_status(), ScheduledAction.STATUS_DONE)
+        self.assertTrue(kept.is_pending())
+
+    def test_unknown_id(self):
+        self.assertRaises(KeyError, self.scheduler.get, 42)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,102 @@
+import logging
+import time
+import unittest
+
+from devcontroller.misc.error import ExecutionError
+from devcontroller.misc.sequence import Sequence, Stage
+
+
+class SequenceTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+
+    def _sequence(self, stages):
+        return Sequence('Test', stages, logging.getLogger('test_sequence'), lambda: self.calls.append('rollback'))
+
+    def _wait(self, sequence, timeout=2.0):
+        end = time.time() + timeout
+        while sequence.is_running() and time.time() < end:
+            time.sleep(0.01)
+
+    def test_stages_run_in_order(self):
+        sequence = self._sequence([Stage('a', lambda: self.calls.append('a')),
+                                   Stage('b', lambda: self.calls.append('b'), lambda: True)])
+
+        times = sequence.run()
+
+        self.assertEqual(self.calls, ['a', 'b'])
+        self.assertEqual([(name, status) for name, duration, status in times],
+                         [('a', Sequence.STATUS_DONE), ('b', Sequence.STATUS_DONE)])
+        self.assertIsNone(sequence.get_current_stage())
+
+    def test_timeout_rolls_back(self):
+        sequence = self._sequence([Stage('a', None, lambda: False, timeout=0.05, poll=0.01),
+                                   Stage('b', lambda: self.calls.append('b'))])
+
+        self.assertRaises(ExecutionError, sequence.run)
+        self.assertEqual(self.calls, ['rollback'])
+        self.assertEqual(sequence.get_stage_times()[0][2], Sequence.STATUS_FAILED)
+
+    def test_failing_condition_rolls_back(self):
+        def fail():
+            raise ExecutionError("pump did not spin up")
+
+        sequence = self._sequence([Stage('a', None, fail)])
+
+        self.assertRaises(ExecutionError, sequence.run)
+        self.assertEqual(self.calls, ['rollback'])
+
+    def test_failing_rollback_does_not_hide_the_error(self):
+        def rollback():
+            raise RuntimeError("relay offline")
+
+        sequence = Sequence('Test', [Stage('a', None, lambda: False, timeout=0, poll=0.01)],
+                            logging.getLogger('test_sequence'), rollback)
+
+        self.assertRaises(ExecutionError, sequence.run)
+
+    def test_stop_does_not_roll_back(self):
+        sequence = self._sequence([Stage('a', None, lambda: False, poll=0.01),
+                                   Stage('b', lambda: self.calls.append('b'))])
+
+        sequence.start()
+        time.sleep(0.05)
+        sequence.stop()
+        self._wait(sequence)
+
+        self.assertIsNone(sequence.get_error())
+        self.assertEqual(self.calls, [])
+        self.assertEqual(sequence.get_stage_times()[0][2], Sequence.STATUS_STOPPED)
+
+    def test_interrupt_does_not_roll_back(self):
+        def interrupt():
+            raise KeyboardInterrupt()
+
+        sequence = self._sequence([Stage('a', None, interrupt)])
+
+        self.assertRaises(KeyboardInterrupt, sequence.run)
+        self.assertEqual(self.calls, [])
+        self.assertEqual(sequence.get_stage_times()[0][2], Sequence.STATUS_STOPPED)
+
+    def test_background_failure_is_stored(self):
+        sequence = self._sequence([Stage('a', None, lambda: False, timeout=0.05, poll=0.01)])
+
+        sequence.start()
+        self._wait(sequence)
+
+        self.assertFalse(sequence.is_running())
+        self.assertIsInstance(sequence.get_error(), ExecutionError)
+        self.assertEqual(self.calls, ['rollback'])
+
+    def test_background_success(self):
+        sequence = self._sequence([Stage('a', lambda: self.calls.append('a'))])
+
+        sequence.start()
+        self._wait(sequence)
+
+        self.assertIsNone(sequence.get_error())
+        self.assertEqual(self.calls, ['a'])
+
+
+if __name__ == '__main__':
+    unittest.main()
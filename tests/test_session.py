@@ -0,0 +1,46 @@
+import unittest
+
+from devcontroller.misc.session import NestedSession
+
+
+class NestedSessionTest(unittest.TestCase):
+    def setUp(self):
+        self.calls = []
+        self.session = NestedSession(lambda: self.calls.append('enter'), lambda: self.calls.append('leave'), 'pump')
+
+    def test_nested(self):
+        with self.session as pump:
+            self.assertEqual(pump, 'pump')
+            with self.session:
+                with self.session:
+                    self.assertEqual(self.session.get_depth(), 3)
+
+        self.assertEqual(self.calls, ['enter', 'leave'])
+        self.assertEqual(self.session.get_depth(), 0)
+
+    def test_leave_on_error(self):
+        try:
+            with self.session:
+                with self.session:
+                    raise RuntimeError()
+        except RuntimeError:
+            pass
+
+        self.assertEqual(self.calls, ['enter', 'leave'])
+        self.assertEqual(self.session.get_depth(), 0)
+
+    def test_leave_if_enter_fails(self):
+        def enter():
+            raise RuntimeError()
+
+        session = NestedSession(enter, lambda: self.calls.append('leave'))
+        with self.assertRaises(RuntimeError):
+            with session:
+                self.fail("must not be reached")
+
+        self.assertEqual(self.calls, ['leave'])
+        self.assertEqual(session.get_depth(), 0)
+
+
+if __name__ == '__main__':
+    unittest.main()
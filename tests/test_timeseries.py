@@ -0,0 +1,89 @@
+import os
+import shutil
+import tempfile
+import unittest
+
+from devcontroller.misc.timeseries import TimeSeriesFile
+
+
+class TimeSeriesFileTest(unittest.TestCase):
+    def setUp(self):
+        self.path = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.path)
+
+    def _open(self, capacity=3, record_format='dd'):
+        return TimeSeriesFile('series.bin', record_format, capacity, self.path)
+
+    def test_append_and_read(self):
+        series = self._open()
+        series.append((1.0, 10.0))
+        series.append((2.0, 20.0))
+
+        self.assertEqual(len(series), 2)
+        self.assertEqual(series.read(), [(1.0, 10.0), (2.0, 20.0)])
+        self.assertEqual(series.read(since=2.0), [(2.0, 20.0)])
+        series.close()
+
+    def test_wraparound(self):
+        series = self._open()
+        for i in range(5):
+            series.append((float(i), float(i * 10)))
+
+        self.assertEqual(len(series), 3)
+        self.assertEqual(series.read(), [(2.0, 20.0), (3.0, 30.0), (4.0, 40.0)])
+        # the file does not grow beyond the capacity
+        self.assertEqual(os.path.getsize(series.get_file()), TimeSeriesFile.HEADER.size + 3 * 16)
+        series.close()
+
+    def test_reopen(self):
+        series = self._open()
+        for i in range(4):
+            series.append((float(i), 0.0))
+        series.close()
+
+        series = self._open()
+        self.assertEqual([record[0] for record in series.read()], [1.0, 2.0, 3.0])
+        series.append((4.0, 0.0))
+        self.assertEqual([record[0] for record in series.read()], [2.0, 3.0, 4.0])
+        series.close()
+
+    def test_different_layout(self):
+        series = self._open()
+        series.append((1.0, 10.0))
+        series.close()
+
+        series = self._open(capacity=5)
+        self.assertEqual(series.read(), [])
+        series.close()
+
+    def test_empty_file(self):
+        open(os.path.join(self.path, 'series.bin'), 'wb').close()
+
+        series = self._open()
+        self.assertEqual(series.read(), [])
+        series.append((1.0, 10.0))
+        self.assertEqual(series.read(), [(1.0, 10.0)])
+        series.close()
+
+    def test_truncated_file(self):
+        filename = os.path.join(self.path, 'series.bin')
+
+        # in the header, and in the second record
+        for size in [TimeSeriesFile.HEADER.size - 4, TimeSeriesFile.HEADER.size + 20]:
+            series = self._open()
+            series.append((1.0, 10.0))
+            series.append((2.0, 20.0))
+            series.close()
+
+            with open(filename, 'r+b') as f:
+                f.truncate(size)
+
+            series = self._open()
+            self.assertEqual(series.read(), [])
+            series.close()
+
+
+if __name__ == '__main__':
+    unittest.main()